@@ -2,34 +2,116 @@
 FastAPI application exposing lead generation and lead assessment endpoints.
 """
 import os
-import json
+import time
+import orjson
 import logging
-from typing import List, Dict, Any, Optional
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-import threading
 
-from lead_generation import PayULeadGenerator
+from lead_generation import run_lead_generation_job
 from lead_assessor import LeadAssessor
 from models.lead import Lead
-from sqlalchemy import create_engine
+from models.base import JSONDocument
+from sqlalchemy import bindparam, create_engine, func, literal, select
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
 
 load_dotenv(override=True)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Configuration is read once; a missing DATABASE_URL stops the worker at startup
+# instead of surfacing as a 500 on the first request
+DATABASE_URL = os.environ.get("DATABASE_URL")
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "payu_leads.db")
+if not DATABASE_URL:
+    raise RuntimeError("DATABASE_URL environment variable not set")
+
+def _async_database_url(db_url: str) -> URL:
+    """Point DATABASE_URL at the asyncio driver for its backend.
+
+    DATABASE_URL is shared with the synchronous generator/assessor, so it
+    usually names a blocking driver (pysqlite, psycopg2).
+    """
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+# Lead generation mixes CPU-bound parsing with blocking I/O; run it in worker
+# processes so it cannot hold the API process's GIL. "spawn" avoids forking a
+# process that already has an event loop, engine and threads running.
+# Every uvicorn worker builds its own pool, so jobs also take one of
+# GENERATION_WORKERS lock slots beside the database: this is the total number of
+# generation jobs running at once across all API workers, not per worker.
+GENERATION_WORKERS = 2
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the per-process database engines and generation pool.
+    
+    All are created when the worker starts serving and released on shutdown,
+    so pooled connections are closed and in-flight generation jobs finish.
+    """
+    engine = create_async_engine(
+        _async_database_url(DATABASE_URL),
+        pool_size=20,
+        max_overflow=40,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+    app.state.sessionmaker = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    # The assessor works on synchronous sessions; every /leads/assess request draws from this pool
+    assessor_engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=1800)
+    app.state.assessor_sessionmaker = sessionmaker(bind=assessor_engine)
+    app.state.generation_pool = ProcessPoolExecutor(
+        max_workers=GENERATION_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    try:
+        yield
+    finally:
+        # Queued jobs are dropped; running ones are waited for off the event loop
+        await run_in_threadpool(app.state.generation_pool.shutdown, cancel_futures=True)
+        await engine.dispose()
+        await run_in_threadpool(assessor_engine.dispose)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AscendAI Lead Management API",
     description="API for generating and assessing leads using AI",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
+# Lead lists embed full assessments; compress anything over 1 KB (level 5 balances CPU and ratio)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+async def get_db(request: Request):
+    """Yield a session from the shared pool and close it once the request is done."""
+    async with request.app.state.sessionmaker() as session:
+        yield session
 
 # ============================================================================
 # Pydantic Models (Request/Response)
@@ -41,8 +123,10 @@ class LeadGenerationRequest(BaseModel):
         None, 
         description="Optional custom search queries. If not provided, defaults will be used."
     )
-    limit: Optional[int] = Field(
+    limit: int = Field(
         10,
+        ge=1,
+        le=100,
         description="Maximum number of leads to generate"
     )
 
@@ -59,10 +143,13 @@ class LeadAssessmentRequest(BaseModel):
     """Request model for assessing leads."""
     lead_ids: Optional[List[int]] = Field(
         None,
+        max_length=100,
         description="Specific lead IDs to assess. If not provided, assesses all unassessed leads."
     )
-    limit: Optional[int] = Field(
+    limit: int = Field(
         5,
+        ge=1,
+        le=100,
         description="Maximum number of leads to assess"
     )
 
@@ -95,6 +182,94 @@ class HealthResponse(BaseModel):
     timestamp: str
 
 
+# ============================================================================
+# SQL Helpers
+# ============================================================================
+
+class json_field(FunctionElement):
+    """Top-level key of a JSON document stored in a TEXT column, extracted by the database.
+
+    Only the sub-document crosses the wire, as JSON text decoded by JSONDocument
+    (None when the key is missing or, on SQLite, when a legacy row is not valid JSON),
+    so callers never load the whole `raw_data` document.
+    """
+    type = JSONDocument()
+    inherit_cache = True
+
+    def __init__(self, column, key: str):
+        super().__init__(column, literal(key))
+
+
+@compiles(json_field)
+def _compile_json_field(element, compiler, **kw):
+    column, key = [compiler.process(c, **kw) for c in element.clauses]
+    # json_quote keeps scalar values JSON-encoded so the result type can decode them
+    return f"CASE WHEN json_valid({column}) THEN json_quote(json_extract({column}, '$.' || {key})) END"
+
+
+@compiles(json_field, "postgresql")
+def _compile_json_field_postgresql(element, compiler, **kw):
+    column, key = [compiler.process(c, **kw) for c in element.clauses]
+    # Cast back to text so the driver hands JSONDocument a string rather than a decoded jsonb value
+    return f"CAST(CAST({column} AS jsonb) -> {key} AS TEXT)"
+
+
+def _assessment_of(value: Any) -> Optional[Dict[str, Any]]:
+    """The extracted assessment when it is an object; None for legacy or unassessed rows."""
+    return value if isinstance(value, dict) else None
+
+
+# Statements are built once at import; handlers only supply bind parameters
+# Only the assessment sub-document leaves the database, not the raw_data blob
+STMT_LEAD_BY_ID = select(
+    Lead.id,
+    Lead.company_name,
+    Lead.industry,
+    Lead.source_url,
+    Lead.description,
+    Lead.lead_score,
+    Lead.status,
+    Lead.created_at,
+    Lead.updated_at,
+    json_field(Lead.raw_data, "assessment").label("assessment"),
+).where(Lead.id == bindparam("lead_id"))
+
+# Newest first, id breaking ties, so offset pages are stable; walked backwards on ix_lead_created
+# or ix_lead_status_created instead of sorting the table
+_LIST_ORDER = (Lead.created_at.desc(), Lead.id.desc())
+_STMT_LIST_LEADS = select(
+    Lead.id,
+    Lead.company_name,
+    Lead.industry,
+    Lead.source_url,
+    Lead.lead_score,
+    Lead.status,
+    Lead.created_at,
+    json_field(Lead.raw_data, "assessment").label("assessment"),
+).order_by(*_LIST_ORDER)
+STMT_LIST_LEADS = _STMT_LIST_LEADS.offset(bindparam("offset")).limit(bindparam("limit"))
+STMT_LIST_LEADS_BY_STATUS = (
+    _STMT_LIST_LEADS.where(Lead.status == bindparam("status"))
+    .offset(bindparam("offset"))
+    .limit(bindparam("limit"))
+)
+# /leads?detail=true rows carry the /leads/{id} columns, so clients can skip per-lead fetches
+_STMT_LIST_LEAD_DETAILS = select(*STMT_LEAD_BY_ID.selected_columns).order_by(*_LIST_ORDER)
+STMT_LIST_LEAD_DETAILS = _STMT_LIST_LEAD_DETAILS.offset(bindparam("offset")).limit(bindparam("limit"))
+STMT_LIST_LEAD_DETAILS_BY_STATUS = (
+    _STMT_LIST_LEAD_DETAILS.where(Lead.status == bindparam("status"))
+    .offset(bindparam("offset"))
+    .limit(bindparam("limit"))
+)
+# Rows fetched per cursor round-trip while streaming /leads
+LEADS_STREAM_BATCH_SIZE = 50
+STMT_COUNT_LEADS = select(func.count(Lead.id))
+STMT_COUNT_LEADS_BY_STATUS = STMT_COUNT_LEADS.where(Lead.status == bindparam("status"))
+
+# Per-status counts and average score, reduced by the database in one round-trip
+STMT_STATUS_STATS = select(Lead.status, func.count(Lead.id), func.avg(Lead.lead_score)).group_by(Lead.status)
+
+
 # ============================================================================
 # Health Check
 # ============================================================================
@@ -112,8 +287,18 @@ async def health_check():
 # Lead Generation Endpoints
 # ============================================================================
 
-@app.post("/leads/generate", response_model=LeadGenerationResponse)
-async def generate_leads(request: LeadGenerationRequest) -> LeadGenerationResponse:
+def _on_lead_generation_done(future: Future) -> None:
+    """Log the outcome of a generation job and refresh /stats (runs in the pool's callback thread)."""
+    try:
+        logger.info("Background lead generation finished: generated=%s", future.result())
+    except Exception:
+        logger.exception("Background lead generation failed")
+    finally:
+        _invalidate_stats_cache()
+
+
+@app.post("/leads/generate", responses={200: {"model": LeadGenerationResponse}})
+async def generate_leads(request: LeadGenerationRequest, http_request: Request) -> ORJSONResponse:
     """
     Generate new leads using AI-powered search and analysis.
     
@@ -122,20 +307,12 @@ async def generate_leads(request: LeadGenerationRequest) -> LeadGenerationRespon
     
     Args:
         request: LeadGenerationRequest with optional custom search queries and limit
+        http_request: Incoming request, used to reach the app's generation pool
         
     Returns:
         LeadGenerationResponse with status and list of generated leads
     """
     try:
-        db_url = os.environ.get("DATABASE_URL")
-        if not db_url:
-            raise HTTPException(
-                status_code=500,
-                detail="DATABASE_URL environment variable not set"
-            )
-        
-        generator = PayULeadGenerator(db_path= os.environ.get("DATABASE_PATH", "payu_leads.db"))
-        
         # Use custom queries if provided, otherwise use defaults
         # queries = request.search_queries or generator.search_queries()
         
@@ -150,25 +327,25 @@ async def generate_leads(request: LeadGenerationRequest) -> LeadGenerationRespon
             # except Exception as e:
             #     logger.warning(f"Failed to generate leads for query '{query}': {e}")
             #     continue
-        # start generation in a background thread so the request returns immediately
-        def _bg_run(max_queries: int, delay: int):
-            try:
-                logger.info("Background lead generation started: max_queries=%s", max_queries)
-                result = generator.run_lead_generation(max_queries=max_queries, delay=delay)
-                total = len(result.get('leads', [])) if isinstance(result, dict) else 0
-                logger.info("Background lead generation finished: generated=%s", total)
-            except Exception:
-                logger.exception("Background lead generation failed")
-
-        thread = threading.Thread(target=_bg_run, args=(request.limit, 3), daemon=True)
-        thread.start()
-
-        return LeadGenerationResponse(
+        # run generation in a worker process so the request returns immediately
+        logger.info("Background lead generation started: max_queries=%s", request.limit)
+        future = http_request.app.state.generation_pool.submit(
+            run_lead_generation_job,
+            DATABASE_PATH,
+            request.limit,
+            3,
+            GENERATION_WORKERS,
+        )
+        future.add_done_callback(_on_lead_generation_done)
+
+        # Fields are built here, not user input: skip validation on construction and on return
+        response = LeadGenerationResponse.model_construct(
             status="started",
             message="Lead generation has been started in background",
             leads_count=0,
             leads=[]
         )
+        return ORJSONResponse(response.model_dump())
     except Exception as e:
         logger.exception("Lead generation failed")
         raise HTTPException(
@@ -181,8 +358,24 @@ async def generate_leads(request: LeadGenerationRequest) -> LeadGenerationRespon
 # Lead Assessment Endpoints
 # ============================================================================
 
-@app.post("/leads/assess", response_model=LeadAssessmentResponse)
-async def assess_leads(request: LeadAssessmentRequest) -> LeadAssessmentResponse:
+def _load_leads_by_id(assessor: LeadAssessor, lead_ids: List[int]) -> List[Lead]:
+    """Load the requested leads in request order, logging IDs that do not exist."""
+    # One IN (...) query instead of a SELECT per ID
+    leads = assessor.session.query(Lead).filter(Lead.id.in_(lead_ids)).all()
+    leads_by_id = {lead.id: lead for lead in leads}
+    
+    ordered = []
+    for lead_id in lead_ids:
+        lead = leads_by_id.get(lead_id)
+        if not lead:
+            logger.warning(f"Lead with ID {lead_id} not found")
+            continue
+        ordered.append(lead)
+    return ordered
+
+
+@app.post("/leads/assess", responses={200: {"model": LeadAssessmentResponse}})
+async def assess_leads(request: LeadAssessmentRequest, http_request: Request) -> ORJSONResponse:
     """
     Assess leads using web research and LLM analysis.
     
@@ -191,45 +384,37 @@ async def assess_leads(request: LeadAssessmentRequest) -> LeadAssessmentResponse
     
     Args:
         request: LeadAssessmentRequest with optional lead_ids and limit
+        http_request: Incoming request, used to reach the app's assessor sessions
         
     Returns:
         LeadAssessmentResponse with status and list of assessments
     """
     try:
-        db_url = os.environ.get("DATABASE_URL")
-        if not db_url:
-            raise HTTPException(
-                status_code=500,
-                detail="DATABASE_URL environment variable not set"
-            )
-        
-        assessor = LeadAssessor(db_url=db_url)
+        # Assessment blocks on DB, Serper and Bedrock calls; keep it off the event loop
+        assessor = await run_in_threadpool(
+            LeadAssessor, session_factory=http_request.app.state.assessor_sessionmaker
+        )
         
         # If specific lead IDs provided, assess only those; otherwise assess all unassessed
-        if request.lead_ids:
-            assessments = []
-            for lead_id in request.lead_ids:
-                lead = assessor.session.query(Lead).filter(Lead.id == lead_id).first()
-                if not lead:
-                    logger.warning(f"Lead with ID {lead_id} not found")
-                    continue
-                assessment = assessor.assess_lead(lead)
-                assessor.persist_assessment(lead, assessment)
-                assessments.append({
-                    "lead_id": lead.id,
-                    "company_name": lead.company_name,
-                    "assessment": assessment
-                })
-        else:
-            assessments = assessor.assess_all_leads(limit=request.limit)
+        try:
+            if request.lead_ids:
+                leads = await run_in_threadpool(_load_leads_by_id, assessor, request.lead_ids)
+                assessments = await assessor.assess_leads_async(leads)
+            else:
+                assessments = await assessor.assess_all_leads_async(limit=request.limit)
+        finally:
+            await assessor.aclose()
         
+        _invalidate_stats_cache()
         logger.info(f"Assessed {len(assessments)} leads")
-        return LeadAssessmentResponse(
+        # Assessments come straight from the assessor; skip validation on construction and on return
+        response = LeadAssessmentResponse.model_construct(
             status="success",
             message=f"Successfully assessed {len(assessments)} leads",
             assessments_count=len(assessments),
             assessments=assessments
         )
+        return ORJSONResponse(response.model_dump())
     except Exception as e:
         logger.exception("Lead assessment failed")
         raise HTTPException(
@@ -242,8 +427,8 @@ async def assess_leads(request: LeadAssessmentRequest) -> LeadAssessmentResponse
 # Lead Retrieval Endpoints
 # ============================================================================
 
-@app.get("/leads/{lead_id}", response_model=LeadDetailResponse)
-async def get_lead(lead_id: int) -> LeadDetailResponse:
+@app.get("/leads/{lead_id}", responses={200: {"model": LeadDetailResponse}})
+async def get_lead(lead_id: int, session: AsyncSession = Depends(get_db)) -> ORJSONResponse:
     """
     Retrieve a single lead with its assessment details.
     
@@ -254,166 +439,187 @@ async def get_lead(lead_id: int) -> LeadDetailResponse:
         LeadDetailResponse with lead and assessment information
     """
     try:
-        db_url = os.environ.get("DATABASE_URL")
-        if not db_url:
-            raise HTTPException(
-                status_code=500,
-                detail="DATABASE_URL environment variable not set"
-            )
-        
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        
-        lead = session.query(Lead).filter(Lead.id == lead_id).first()
-        if not lead:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Lead with ID {lead_id} not found"
-            )
-        
-        # Parse assessment from raw_data if available
-        assessment = None
-        if lead.raw_data:
-            try:
-                raw = json.loads(lead.raw_data)
-                assessment = raw.get("assessment")
-            except Exception:
-                pass
-        
-        return LeadDetailResponse(
-            id=lead.id,
-            company_name=lead.company_name,
-            industry=lead.industry or "",
-            source_url=lead.source_url or "",
-            description=lead.description or "",
-            lead_score=lead.lead_score or 0.0,
-            status=lead.status or "new",
-            assessment=assessment,
-            created_at=lead.created_at.isoformat() if lead.created_at else "",
-            updated_at=lead.updated_at.isoformat() if lead.updated_at else ""
-        )
-    except HTTPException:
-        raise
+        result = await session.execute(STMT_LEAD_BY_ID, {"lead_id": lead_id})
+        lead = result.one_or_none()
     except Exception as e:
         logger.exception(f"Failed to retrieve lead {lead_id}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to retrieve lead: {str(e)}"
         )
+    if not lead:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Lead with ID {lead_id} not found"
+        )
+    
+    # Data is already shaped by the query; skip response_model re-validation
+    return ORJSONResponse(_lead_detail_to_dict(lead))
 
 
-@app.get("/leads", response_model=Dict[str, Any])
+@app.get("/leads")
 async def list_leads(
+    request: Request,
     status: Optional[str] = Query(None, description="Filter by lead status (new, assessed)"),
     limit: int = Query(20, ge=1, le=100, description="Maximum number of leads to return"),
-    offset: int = Query(0, ge=0, description="Offset for pagination")
-) -> Dict[str, Any]:
+    offset: int = Query(0, ge=0, description="Offset for pagination"),
+    detail: bool = Query(False, description="Return each lead in the /leads/{lead_id} shape, description included"),
+    session: AsyncSession = Depends(get_db)
+) -> StreamingResponse:
     """
     List all leads with optional filtering.
     
+    The page is streamed as a chunked JSON array so the first leads reach the
+    client while the cursor is still draining.
+    
     Args:
         status: Optional filter by lead status
         limit: Maximum number of leads to return
         offset: Offset for pagination
+        detail: Return full lead details instead of the summary rows
         
     Returns:
         Dict with leads and metadata
     """
     try:
-        db_url = os.environ.get("DATABASE_URL")
-        if not db_url:
-            raise HTTPException(
-                status_code=500,
-                detail="DATABASE_URL environment variable not set"
-            )
-        
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        
-        query = session.query(Lead)
+        params = {"offset": offset, "limit": limit}
         if status:
-            query = query.filter(Lead.status == status)
-        
-        total = query.count()
-        leads_data = query.offset(offset).limit(limit).all()
-        
-        leads = []
-        for lead in leads_data:
-            assessment = None
-            if lead.raw_data:
-                try:
-                    raw = json.loads(lead.raw_data)
-                    assessment = raw.get("assessment")
-                except Exception:
-                    pass
-            
-            leads.append({
-                "id": lead.id,
-                "company_name": lead.company_name,
-                "industry": lead.industry,
-                "source_url": lead.source_url,
-                "lead_score": lead.lead_score,
-                "status": lead.status,
-                "assessment": assessment,
-                "created_at": lead.created_at.isoformat() if lead.created_at else None
-            })
-        
-        return {
-            "status": "success",
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-            "leads": leads
-        }
-    except HTTPException:
-        raise
+            params["status"] = status
+            total = await session.scalar(STMT_COUNT_LEADS_BY_STATUS, params)
+            stmt = STMT_LIST_LEAD_DETAILS_BY_STATUS if detail else STMT_LIST_LEADS_BY_STATUS
+        else:
+            total = await session.scalar(STMT_COUNT_LEADS)
+            stmt = STMT_LIST_LEAD_DETAILS if detail else STMT_LIST_LEADS
     except Exception as e:
         logger.exception("Failed to list leads")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to list leads: {str(e)}"
         )
+    
+    head = orjson.dumps({
+        "status": "success",
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    })
+    return StreamingResponse(
+        _stream_leads(
+            request.app.state.sessionmaker, head, stmt, params,
+            _lead_detail_to_dict if detail else _lead_row_to_dict,
+        ),
+        media_type="application/json",
+    )
+
+
+def _lead_detail_to_dict(lead) -> Dict[str, Any]:
+    """Shape one STMT_LEAD_BY_ID row (or ?detail=true listing row) as a lead detail."""
+    return {
+        "id": lead.id,
+        "company_name": lead.company_name,
+        "industry": lead.industry or "",
+        "source_url": lead.source_url or "",
+        "description": lead.description or "",
+        "lead_score": lead.lead_score or 0.0,
+        "status": lead.status or "new",
+        "assessment": _assessment_of(lead.assessment),
+        "created_at": lead.created_at.isoformat() if lead.created_at else "",
+        "updated_at": lead.updated_at.isoformat() if lead.updated_at else ""
+    }
+
+
+def _lead_row_to_dict(lead) -> Dict[str, Any]:
+    """Shape one STMT_LIST_LEADS row for the /leads payload."""
+    return {
+        "id": lead.id,
+        "company_name": lead.company_name,
+        "industry": lead.industry,
+        "source_url": lead.source_url,
+        "lead_score": lead.lead_score,
+        "status": lead.status,
+        "assessment": _assessment_of(lead.assessment),
+        "created_at": lead.created_at.isoformat() if lead.created_at else None
+    }
+
+
+async def _stream_leads(
+    sessionmaker: async_sessionmaker,
+    head: bytes,
+    stmt,
+    params: Dict[str, Any],
+    row_to_dict: Callable[[Any], Dict[str, Any]] = _lead_row_to_dict,
+):
+    """Yield the /leads envelope with its rows serialized one at a time.
+    
+    Runs after the handler has returned, so it opens its own session rather
+    than borrowing the request-scoped one from get_db.
+    """
+    # Reopen the envelope object and append the leads array to it
+    yield head[:-1] + b',"leads":['
+    async with sessionmaker() as session:
+        try:
+            result = await session.stream(
+                stmt, params, execution_options={"yield_per": LEADS_STREAM_BATCH_SIZE}
+            )
+            sep = b""
+            async for lead in result:
+                yield sep + orjson.dumps(row_to_dict(lead))
+                sep = b","
+        except Exception:
+            # Headers are already sent; re-raise so the chunked response is aborted and the
+            # client sees a broken transfer instead of a valid but silently short page
+            logger.exception("Failed while streaming leads")
+            raise
+    yield b"]}"
 
 
 # ============================================================================
 # Status and Stats Endpoints
 # ============================================================================
 
-@app.get("/stats", response_model=Dict[str, Any])
-async def get_stats() -> Dict[str, Any]:
+# Dashboards poll /stats; serve the last aggregate for a few seconds instead of
+# re-querying. Holds (expires_at, payload) and is per worker process: a job's
+# completion only invalidates the cache of the worker that submitted it, so other
+# workers may serve counts up to STATS_CACHE_TTL_SECONDS old.
+STATS_CACHE_TTL_SECONDS = 10
+_stats_cache: Optional[tuple] = None
+
+
+def _invalidate_stats_cache() -> None:
+    """Drop the cached /stats payload so the next request sees fresh writes."""
+    global _stats_cache
+    _stats_cache = None
+
+
+@app.get("/stats")
+async def get_stats(session: AsyncSession = Depends(get_db)) -> ORJSONResponse:
     """
     Get statistics about leads in the database.
     
+    Results are cached for STATS_CACHE_TTL_SECONDS.
+    
     Returns:
         Dict with lead counts by status and average scores
     """
+    global _stats_cache
+    now = time.monotonic()
+    if _stats_cache is not None and _stats_cache[0] > now:
+        return ORJSONResponse(_stats_cache[1])
+    
     try:
-        db_url = os.environ.get("DATABASE_URL")
-        if not db_url:
-            raise HTTPException(
-                status_code=500,
-                detail="DATABASE_URL environment variable not set"
-            )
-        
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        
-        total_leads = session.query(Lead).count()
-        assessed_leads = session.query(Lead).filter(Lead.status == "assessed").count()
-        new_leads = session.query(Lead).filter(Lead.status == "new").count()
+        result = await session.execute(STMT_STATUS_STATS)
+        counts = {}
+        averages = {}
+        for row_status, count, avg in result:
+            counts[row_status] = count
+            averages[row_status] = avg
         
-        # Calculate average lead score for assessed leads
-        avg_score = 0.0
-        if assessed_leads > 0:
-            scores = session.query(Lead.lead_score).filter(Lead.status == "assessed").all()
-            valid_scores = [s[0] for s in scores if s[0] is not None]
-            if valid_scores:
-                avg_score = sum(valid_scores) / len(valid_scores)
+        total_leads = sum(counts.values())
+        assessed_leads = counts.get("assessed", 0)
+        new_leads = counts.get("new", 0)
+        avg_score = averages.get("assessed") or 0.0
         
-        return {
+        payload = {
             "status": "success",
             "total_leads": total_leads,
             "assessed_leads": assessed_leads,
@@ -421,8 +627,8 @@ async def get_stats() -> Dict[str, Any]:
             "average_lead_score": round(avg_score, 2),
             "timestamp": datetime.utcnow().isoformat()
         }
-    except HTTPException:
-        raise
+        _stats_cache = (now + STATS_CACHE_TTL_SECONDS, payload)
+        return ORJSONResponse(payload)
     except Exception as e:
         logger.exception("Failed to get stats")
         raise HTTPException(
@@ -433,9 +639,17 @@ async def get_stats() -> Dict[str, Any]:
 
 if __name__ == "__main__":
     import uvicorn
+    # Set API_RELOAD=1 for local development; reload mode is always single-process
+    reload = os.environ.get("API_RELOAD", "").lower() in ("1", "true")
     uvicorn.run(
         "api:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=reload,
+        # Separate worker processes sidestep the GIL; each runs the lifespan and builds its own engine
+        workers=1 if reload else int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # uvicorn[standard] provides uvloop and httptools; "auto" falls back where they are unavailable (Windows)
+        loop="auto",
+        http="auto",
+        log_level="info"
     )
@@ -0,0 +1,123 @@
+import time
+import sqlite3
+import hashlib
+import logging
+import functools
+import threading
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path("cache/kv.sqlite3")
+# Upper bound on stored entries; the oldest are evicted first once it is exceeded
+DEFAULT_MAX_ENTRIES = 100_000
+# Expired rows are purged and the cap enforced on open and then every this many writes
+PRUNE_EVERY_WRITES = 1000
+
+
+class KVCache:
+    """Key/value cache for Serper, page, and LLM responses backed by one SQLite file.
+
+    Each write is a single-row upsert in WAL mode rather than a new file plus a
+    directory update. Keys are namespaced and hashed; values are bytes with an
+    optional expiry. One instance can be shared across threads, and separate
+    processes each open their own connection to the same file. Expired rows are
+    purged periodically and at most `max_entries` are kept, oldest first out.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+            )
+            self._conn = conn
+            self._prune(conn)
+        return self._conn
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop expired rows, then the oldest rows beyond `max_entries`; caller holds the lock.
+
+        INSERT OR REPLACE gives a rewritten key a fresh rowid, so rowid order is write order.
+        """
+        try:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        except sqlite3.Error as e:
+            logger.warning("Failed to prune cache: %s", e)
+
+    @staticmethod
+    def _key(namespace: str, key: str) -> str:
+        # Non-cryptographic use: blake2b is faster than sha256 and 128 bits is ample for cache keys
+        return f"{namespace}:{hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()}"
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """Return the stored bytes, or None when missing or expired."""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ?", (self._key(namespace, key),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Failed to read %s cache: %s", namespace, e)
+            return None
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return row[0]
+
+    def set(self, namespace: str, key: str, value: bytes, expire: Optional[float] = None) -> None:
+        """Store bytes under a key, replacing any previous value; `expire` is in seconds."""
+        expires_at = time.time() + expire if expire is not None else None
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (self._key(namespace, key), value, expires_at),
+                )
+                self._writes += 1
+                if self._writes % PRUNE_EVERY_WRITES == 0:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            logger.warning("Failed to write %s cache: %s", namespace, e)
+
+    def get_json(self, namespace: str, key: str) -> Optional[Any]:
+        raw = self.get(namespace, key)
+        if raw is None:
+            return None
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            logger.warning("Corrupt %s cache entry: %s", namespace, e)
+            return None
+
+    def set_json(self, namespace: str, key: str, value: Any, expire: Optional[float] = None) -> None:
+        self.set(namespace, key, orjson.dumps(value), expire)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+@functools.lru_cache(maxsize=1)
+def get_cache() -> KVCache:
+    """Return the process-wide cache at DEFAULT_CACHE_PATH."""
+    return KVCache()
@@ -1,44 +1,262 @@
 import os
 import json
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-
-import requests
+import functools
+import threading
+import weakref
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
+from urllib.parse import urlparse
+
+import httpx
+import orjson
+from aiolimiter import AsyncLimiter
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    StrictFloat,
+    StrictInt,
+    StrictStr,
+    ValidationError,
+    ValidatorFunctionWrapHandler,
+    field_validator,
+)
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from llm import BedrockLLM
+from llm import get_llm
+from kv_cache import get_cache
 from models.lead import Lead
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
-load_dotenv(override=True)
+
+
+# Factor-specific search keywords; only the first six of each are used in a query
+_KEYWORDS_MAP: Dict[str, Tuple[str, ...]] = {
+    "tech_stack": ("built on", "powered by", "Shopify", "WooCommerce", "WordPress", "Magento", "bigcommerce", "platform"),
+    "business_age_months": ("founded", "established", "since", "founded in", "incorporated", "year"),
+    "merchant_category": ("subscription", "SaaS", "services", "e-commerce", "online store", "marketplace"),
+    "company_scale": ("employees", "team of", "headcount", "startup", "enterprise", "SMB", "small business"),
+    "integration_readiness_score": ("API", "integrations", "developer docs", "plugins", "extensions", "Zapier", "webhooks"),
+    "transaction_intent_score": ("checkout", "buy now", "pricing", "add to cart", "purchase", "orders", "payment"),
+    "digital_maturity_score": ("analytics", "Google Analytics", "tracking", "mobile friendly", "responsive", "PWA", "SEO"),
+    "web_presence_quality": ("press", "blog", "mentions", "backlinks", "domain authority", "traffic", "social"),
+    "fraud_risk_pattern_score": ("chargeback", "fraud", "complaint", "scam", "refund", "lawsuit", "security breach"),
+    "traffic_check": ("monthly visits", "traffic", "SimilarWeb", "Alexa", "semrush", "traffic estimate"),
+    "brand_search_volume": ("search volume", "brand searches", "Google Trends", "searches for"),
+}
+
+
+def _or_clause(keywords: Tuple[str, ...]) -> str:
+    """Join search keywords with OR, quoting multi-word phrases."""
+    return " OR ".join([f'"{k}"' if " " in k else k for k in keywords[:6]])
+
+
+# OR clauses depend only on the factor, so they are built once at import
+_FACTOR_OR_CLAUSE: Dict[str, str] = {factor: _or_clause(kws) for factor, kws in _KEYWORDS_MAP.items()}
+
+
+# Token buckets per event loop, then per external service. API quotas are per account,
+# not per client object, so every instance in the process (e.g. one LeadAssessor per API
+# request) draws from the same bucket. AsyncLimiter queues futures of the loop it is used
+# on, so each running loop gets its own; the sync wrappers' short-lived asyncio.run loops
+# run one at a time and their buckets are dropped with the loop
+_LIMITERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncLimiter]]" = weakref.WeakKeyDictionary()
+# The first rate registered for a service is the quota for the whole process
+_LIMITER_RATES: Dict[str, float] = {}
+_IGNORED_RATES: Set[Tuple[str, float]] = set()
+_LIMITERS_LOCK = threading.Lock()
+
+
+def _shared_limiter(service: str, rate: float) -> AsyncLimiter:
+    """Return the process-wide token bucket for `service` on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _LIMITERS_LOCK:
+        quota = _LIMITER_RATES.setdefault(service, rate)
+        if quota != rate and (service, rate) not in _IGNORED_RATES:
+            _IGNORED_RATES.add((service, rate))
+            logger.warning("Ignoring %s rate %s; the shared limiter is set to %s/s", service, rate, quota)
+        per_service = _LIMITERS.setdefault(loop, {})
+        limiter = per_service.get(service)
+        if limiter is None:
+            limiter = per_service[service] = AsyncLimiter(quota, 1)
+        return limiter
+
+
+def _domain_of(source_url: Optional[str]) -> str:
+    """Return the host of a lead's source URL for `site:` filtering, or "" when unknown."""
+    if not source_url:
+        return ""
+    try:
+        return urlparse(source_url).netloc
+    except Exception:
+        return source_url
+
+
+@functools.lru_cache(maxsize=4096)
+def _seo_query(name: str, industry: str, domain: str, factor: str) -> str:
+    """Build the SEO-style Serper query for one factor of one company."""
+    quoted_name = f'"{name}"' if name else ""
+    or_clause = _FACTOR_OR_CLAUSE.get(factor) or _or_clause((factor, "website", "reviews"))
+    parts = [p for p in [quoted_name, or_clause] if p]
+    q = f"({' '.join(parts)})"
+    if industry:
+        q = f"{q} {industry}"
+    if domain:
+        q = f"{q} site:{domain}"
+    return q
+
+
+def _unit_score(value: Any) -> Optional[float]:
+    """Coerce an LLM score to a float clamped to [0, 1]; None if it is missing or not numeric."""
+    if isinstance(value, (int, float)):
+        fv = float(value)
+    elif isinstance(value, str):
+        try:
+            fv = float(value)
+        except ValueError:
+            return None
+    else:
+        return None
+    if fv != fv:  # NaN
+        return None
+    return 0.0 if fv < 0.0 else 1.0 if fv > 1.0 else fv
+
+
+def _trim_snippet(text: str, limit: int = 400) -> str:
+    """Truncate snippet text to `limit` characters, cutting at a word boundary."""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > 0 else cut).rstrip() + "…"
+
+
+def _dedupe_snippets(snippets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop snippets repeating an earlier (title, link host) pair, keeping the first."""
+    seen = set()
+    unique = []
+    for snippet in snippets:
+        key = (str(snippet.get("title") or "")[:80], _domain_of(snippet.get("link")))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(snippet)
+    return unique
 
 
 class SerperClient:
     """Minimal Serper (https://serper.dev) client used to run web searches."""
 
     ENDPOINT = "https://google.serper.dev/search"
+    # Successful responses are kept in the shared KV cache and reused for identical queries
+    CACHE_NAMESPACE = "serper_assess"
+    CACHE_TTL_SECONDS = 7 * 24 * 3600
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, requests_per_second: float = 10):
         self.api_key = api_key or os.environ.get("SERPER_API_KEY")
         if not self.api_key:
             raise RuntimeError("SERPER_API_KEY not set in environment")
+        self._client: Optional[httpx.AsyncClient] = None
+        # Token bucket rate: paces requests below the plan's quota instead of hitting 429s
+        self.requests_per_second = requests_per_second
+        self._cache = get_cache()
+        # Cache lookups answered from / missing the KV cache over this client's lifetime
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def limiter(self) -> AsyncLimiter:
+        """Token bucket shared by every Serper client in the process; only valid inside a running event loop."""
+        return _shared_limiter("serper", self.requests_per_second)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Keep-alive client reused across searches; bound to the event loop that first uses it.
+
+        HTTP/2 lets concurrent factor searches share one TLS connection to Serper.
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"X-API-KEY": self.api_key, "Content-Type": "application/json"},
+                timeout=15,
+                # retries covers connection failures only (resets, refused connects)
+                transport=httpx.AsyncHTTPTransport(
+                    http2=True,
+                    retries=2,
+                    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close pooled connections; the next search opens a fresh client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search(self, q: str, num_results: int = 3) -> List[Dict[str, Any]]:
+        cache_key = f"{num_results}:{q}"
+        # The KV cache is blocking SQLite behind a lock; keep it off the event loop
+        cached = await asyncio.to_thread(self._cache.get_json, self.CACHE_NAMESPACE, cache_key)
+        if cached is not None:
+            self.cache_hits += 1
+            logger.debug("Serper cache hit for query '%s'", q)
+            return cached
+        self.cache_misses += 1
 
-    def search(self, q: str, num_results: int = 3) -> List[Dict[str, Any]]:
-        headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
         payload = {"q": q, "num": num_results}
         try:
-            resp = requests.post(self.ENDPOINT, headers=headers, json=payload, timeout=15)
+            async with self.limiter:
+                resp = await self.client.post(self.ENDPOINT, json=payload)
             resp.raise_for_status()
             data = resp.json()
             # Serper returns items under 'organic' for standard responses
             results = data.get("organic") or data.get("results") or []
-            return results[:num_results]
+            results = results[:num_results]
         except Exception as e:
             logger.warning("Serper search failed for query '%s': %s", q, e)
             return []
+        await asyncio.to_thread(
+            self._cache.set_json, self.CACHE_NAMESPACE, cache_key, results, expire=self.CACHE_TTL_SECONDS
+        )
+        return results
+
+
+# A factor answer is a score, a count or a category label
+FactorValue = Optional[Union[StrictInt, StrictFloat, StrictStr]]
+
+
+class FactorBundle(BaseModel):
+    """Factor values parsed from an LLM answer.
+
+    Unknown keys are ignored and a field whose value has the wrong shape is
+    dropped (None) rather than failing the whole answer.
+    """
+    model_config = ConfigDict(extra="ignore", allow_inf_nan=False)
+
+    tech_stack: FactorValue = None
+    business_age_months: FactorValue = None
+    merchant_category: FactorValue = None
+    company_scale: FactorValue = None
+    integration_readiness_score: FactorValue = None
+    transaction_intent_score: FactorValue = None
+    digital_maturity_score: FactorValue = None
+    web_presence_quality: FactorValue = None
+    fraud_risk_pattern_score: FactorValue = None
+    traffic_check: FactorValue = None
+    brand_search_volume: FactorValue = None
+    lead_score: Optional[float] = None
+    rationale: Optional[str] = None
+
+    @field_validator("*", mode="wrap")
+    @classmethod
+    def _drop_invalid(cls, value: Any, handler: ValidatorFunctionWrapHandler) -> Any:
+        try:
+            return handler(value)
+        except ValidationError:
+            return None
 
 
 class LeadAssessor:
@@ -62,97 +280,101 @@ class LeadAssessor:
         "brand_search_volume",
     ]
 
-    def __init__(self, db_url: Optional[str] = None, serper_api_key: Optional[str] = None):
-        db_url = db_url or os.environ.get("DATABASE_URL")
-        if not db_url:
-            raise RuntimeError("DATABASE_URL must be set to connect to the leads database")
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
-        self.session = Session()
+    # Factors scored on 0-1; their mean is the fallback lead_score
+    SCORE_KEYS = (
+        "integration_readiness_score",
+        "transaction_intent_score",
+        "digital_maturity_score",
+        "web_presence_quality",
+        "fraud_risk_pattern_score",
+        "traffic_check",
+        "brand_search_volume",
+    )
+
+    # Upper bound on Serper requests in flight for a single lead
+    MAX_PARALLEL_SEARCHES = 8
+    # Upper bound on leads assessed at once by assess_leads_async
+    MAX_PARALLEL_LEADS = 8
+    # A single Bedrock call may not hold up the rest of the assessment longer than this
+    LLM_TIMEOUT_SECONDS = 60.0
+    # Assessments are committed in batches of this many leads
+    PERSIST_BATCH_SIZE = 50
+
+    @staticmethod
+    def configure_logging(level: int = logging.INFO) -> None:
+        """Load `.env` and set up root logging for standalone use.
+
+        Kept out of import so host applications keep their own logging config.
+        """
+        logging.basicConfig(level=level)
+        load_dotenv(override=True)
+
+    def __init__(
+        self,
+        db_url: Optional[str] = None,
+        serper_api_key: Optional[str] = None,
+        serper_rps: float = 10,
+        bedrock_rps: float = 5,
+        session_factory: Optional[sessionmaker] = None,
+    ):
+        # A caller-owned session_factory (the API's) is shared across assessors; otherwise
+        # this assessor owns its engine and disposes of it in close()
+        self._engine = None
+        if session_factory is None:
+            db_url = db_url or os.environ.get("DATABASE_URL")
+            if not db_url:
+                raise RuntimeError("DATABASE_URL must be set to connect to the leads database")
+            self._engine = create_engine(db_url)
+            session_factory = sessionmaker(bind=self._engine)
+        self.session = session_factory()
         # Use Serper for one-factor-at-a-time searches
-        self.serp = SerperClient(api_key=serper_api_key)
-        self.llm = BedrockLLM()
-
-    def _search_for_factor(self, lead: Lead, factor: str, num_results: int = 3) -> List[Dict[str, Any]]:
+        self.serp = SerperClient(api_key=serper_api_key, requests_per_second=serper_rps)
+        self.llm = get_llm()
+        self.bedrock_rps = bedrock_rps
+
+    @property
+    def bedrock_limiter(self) -> AsyncLimiter:
+        """Token bucket shared by every assessor in the process; only valid inside a running event loop."""
+        return _shared_limiter("bedrock", self.bedrock_rps)
+
+    async def _search_for_factor(
+        self, lead: Lead, factor: str, domain: str = "", num_results: int = 3
+    ) -> List[Dict[str, Any]]:
         """Run a focused web search for a single factor for the given lead and return snippets.
 
         The query is built to be search-engine-friendly (SEO-style): it includes the
         quoted company name and a set of factor-specific keywords combined with OR,
-        and when a `source_url` is available it constrains the search to that site.
+        and when the lead's `domain` is known it constrains the search to that site.
         """
-        from urllib.parse import urlparse
-
-        def _seo_query_for_factor(name: str, industry: Optional[str], source_url: Optional[str], factor: str) -> str:
-            quoted_name = f'"{name}"' if name else ""
-            domain = ""
-            if source_url:
-                try:
-                    domain = urlparse(source_url).netloc
-                except Exception:
-                    domain = source_url
-
-            keywords_map = {
-                "tech_stack": ["built on", "powered by", "Shopify", "WooCommerce", "WordPress", "Magento", "bigcommerce", "platform"],
-                "business_age_months": ["founded", "established", "since", "founded in", "incorporated", "year"],
-                "merchant_category": ["subscription", "SaaS", "services", "e-commerce", "online store", "marketplace"],
-                "company_scale": ["employees", "team of", "headcount", "startup", "enterprise", "SMB", "small business"],
-                "integration_readiness_score": ["API", "integrations", "developer docs", "plugins", "extensions", "Zapier", "webhooks"],
-                "transaction_intent_score": ["checkout", "buy now", "pricing", "add to cart", "purchase", "orders", "payment"],
-                "digital_maturity_score": ["analytics", "Google Analytics", "tracking", "mobile friendly", "responsive", "PWA", "SEO"],
-                "web_presence_quality": ["press", "blog", "mentions", "backlinks", "domain authority", "traffic", "social"],
-                "fraud_risk_pattern_score": ["chargeback", "fraud", "complaint", "scam", "refund", "lawsuit", "security breach"],
-                "traffic_check": ["monthly visits", "traffic", "SimilarWeb", "Alexa", "semrush", "traffic estimate"],
-                "brand_search_volume": ["search volume", "brand searches", "Google Trends", "searches for"],
-            }
-
-            kws = keywords_map.get(factor, [factor, "website", "reviews"])[:6]
-            # build OR clause
-            or_clause = " OR ".join([f'"{k}"' if " " in k else k for k in kws])
-            parts = [p for p in [quoted_name, or_clause] if p]
-            q = f"({' '.join(parts)})"
-            if industry:
-                q = f"{q} {industry}"
-            if domain:
-                q = f"{q} site:{domain}"
-            return q
-
         name = (lead.company_name or "").strip()
         industry = (lead.industry or "").strip()
-        source_url = lead.source_url
 
-        q = _seo_query_for_factor(name, industry, source_url, factor)
+        q = _seo_query(name, industry, domain, factor)
 
-        results = self.serp.search(q, num_results=num_results)
+        results = await self.serp.search(q, num_results=num_results)
         snippets: List[Dict[str, Any]] = []
         for r in results:
             title = r.get("title") or r.get("position") or r.get("snippet_title") or ""
             snippet = r.get("snippet") or r.get("summary") or r.get("description") or r.get("snippet_text") or ""
             link = r.get("link") or r.get("url") or r.get("source") or ""
-            snippets.append({"query": q, "title": title, "snippet": snippet, "link": link})
-        return snippets
-
-    def _build_factor_prompt(self, lead: Lead, factor: str, snippets: List[Dict[str, Any]]) -> str:
-        """Build a concise prompt asking the LLM to infer the value for one factor using snippets."""
-        prompt = (
-            f"You are an assistant that inspects web search results and extracts one field for a company.\n"
-            f"Field: {factor}\n"
-            f"Allowed output: Return a single JSON object with keys: \"{factor}\" and optional \"rationale\".\n"
-            f"If the field is a score, return a float between 0 and 1. If it is a categorical value, return one of the allowed categories.\n"
-            f"Return ONLY valid JSON (no markdown).\n\n"
-        )
-        lead_info = {
-            "company_name": lead.company_name,
-            "source_url": lead.source_url,
-            "industry": lead.industry,
-        }
-        prompt += f"LEAD:\n{json.dumps(lead_info, ensure_ascii=False)}\n\nSEARCH_SNIPPETS:\n{json.dumps(snippets, ensure_ascii=False)}\n"
-        return prompt
-
-    def _estimate_factor_with_llm(self, lead: Lead, factor: str, snippets: List[Dict[str, Any]]) -> Dict[str, Any]:
+            snippets.append({"query": q, "title": title, "snippet": _trim_snippet(str(snippet)), "link": link})
+        # Every snippet ends up in the assessment prompt; keep them short and distinct
+        return _dedupe_snippets(snippets)
+
+    @staticmethod
+    def _parse_bundle(res: Any) -> FactorBundle:
+        """Validate the JSON object from an LLM response (a dict, or the first dict of a list)."""
+        if isinstance(res, list) and res:
+            res = res[0]
+        if not isinstance(res, dict):
+            return FactorBundle()
+        return FactorBundle.model_validate(res)
+
+    async def _estimate_factor_with_llm(self, lead: Lead, factor: str, snippets: List[Dict[str, Any]]) -> FactorBundle:
         """Ask the LLM to estimate a factor value when evidence is insufficient.
 
         The LLM is explicitly allowed to provide an estimate (and should mark it with
-        `estimated: true` in the returned object). Return a parsed dict or empty dict.
+        `estimated: true` in the returned object). Return the parsed answer, empty on failure.
         """
         prompt = (
             f"You did not find explicit evidence in the provided snippets. Using the lead information and the snippets, "
@@ -162,17 +384,11 @@ class LeadAssessor:
             f"Return ONLY valid JSON (no markdown).\n\n"
         )
         lead_info = {"company_name": lead.company_name, "source_url": lead.source_url, "industry": lead.industry}
-        prompt += f"LEAD:\n{json.dumps(lead_info, ensure_ascii=False)}\n\nSEARCH_SNIPPETS:\n{json.dumps(snippets, ensure_ascii=False)}\n"
+        prompt += f"LEAD:\n{orjson.dumps(lead_info).decode()}\n\nSEARCH_SNIPPETS:\n{orjson.dumps(snippets).decode()}\n"
         try:
-            res = self.llm.generate_json(prompt, maxTokens=600)
-            parsed = {}
-            if isinstance(res, list) and res:
-                parsed = res[0] if isinstance(res[0], dict) else {}
-            elif isinstance(res, dict):
-                parsed = res
-            return parsed
+            return self._parse_bundle(await self._call_llm(prompt, maxTokens=600))
         except Exception:
-            return {}
+            return FactorBundle()
 
     def _build_prompt(self, lead: Lead, search_snippets: str) -> str:
         prompt = (
@@ -197,69 +413,116 @@ class LeadAssessor:
             "company_name": lead.company_name,
             "source_url": lead.source_url,
             "industry": lead.industry,
-            "description": (lead.description or '')[:2000],
+            "description": (lead.description or '')[:500],
         }
 
-        prompt += f"LEAD:\n{json.dumps(lead_info, ensure_ascii=False)}\n\nSEARCH_SNIPPETS:\n{search_snippets}\n"
+        prompt += f"LEAD:\n{orjson.dumps(lead_info).decode()}\n\nSEARCH_SNIPPETS:\n{search_snippets}\n"
 
         return prompt
 
+    def close(self) -> None:
+        """Close the database session, and dispose of the engine if this assessor created it."""
+        self.session.close()
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+    async def aclose(self) -> None:
+        """Release the pooled Serper connections and the database session held by this assessor."""
+        await self.serp.aclose()
+        await asyncio.to_thread(self.close)
+
+    async def _call_llm(self, prompt: str, maxTokens: int) -> Any:
+        """Run the blocking Bedrock call in a worker thread, bounded by LLM_TIMEOUT_SECONDS.
+
+        BedrockLLM caches responses, so re-assessing a lead with unchanged search
+        results skips Bedrock; such cache hits do not take a rate-limit token.
+        """
+        call = functools.partial(asyncio.to_thread, self.llm.generate_json, prompt, maxTokens=maxTokens)
+        if await asyncio.to_thread(self.llm.is_cached, prompt, maxTokens):
+            return await asyncio.wait_for(call(), timeout=self.LLM_TIMEOUT_SECONDS)
+        # Waiting for a rate-limit slot does not count towards the call timeout
+        async with self.bedrock_limiter:
+            res = await asyncio.wait_for(call(), timeout=self.LLM_TIMEOUT_SECONDS)
+        return res
+
+    async def _search_all_factors(self, lead: Lead) -> Dict[str, List[Dict[str, Any]]]:
+        """Run the per-factor searches for a lead concurrently."""
+        semaphore = asyncio.Semaphore(self.MAX_PARALLEL_SEARCHES)
+        domain = _domain_of(lead.source_url)
+
+        async def _search(factor: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self._search_for_factor(lead, factor, domain, num_results=3)
+
+        results = await asyncio.gather(*(_search(factor) for factor in self.FACTOR_KEYS))
+        return dict(zip(self.FACTOR_KEYS, results))
+
     def assess_lead(self, lead: Lead) -> Dict[str, Any]:
+        """Assess a single Lead record and return the parsed JSON from the LLM.
+
+        Synchronous entry point for worker threads and the CLI; runs
+        `assess_lead_async` on a fresh event loop.
+        """
+        return self._run_sync(self.assess_lead_async(lead))
+
+    def _run_sync(self, coro: Any) -> Any:
+        """Run a coroutine on a fresh event loop and release loop-bound clients afterwards."""
+        async def _run() -> Any:
+            try:
+                return await coro
+            finally:
+                # The HTTP client is tied to this loop, which asyncio.run is about to close
+                await self.aclose()
+
+        return asyncio.run(_run())
+
+    async def assess_lead_async(self, lead: Lead) -> Dict[str, Any]:
         """Assess a single Lead record and return the parsed JSON from the LLM."""
         try:
             logger.info("Asking LLM to assess lead: %s", lead.company_name)
             assessment: Dict[str, Any] = {}
-            raw_search_snippets: Dict[str, Any] = {}
             rationales: Dict[str, str] = {}
 
-            for factor in self.FACTOR_KEYS:
-                snippets = self._search_for_factor(lead, factor, num_results=3)
-                raw_search_snippets[factor] = snippets
-                prompt = self._build_factor_prompt(lead, factor, snippets)
-                try:
-                    res = self.llm.generate_json(prompt, maxTokens=800)
-                except Exception as e:
-                    logger.warning("LLM failed for factor %s: %s", factor, e)
-                    continue
-
-                parsed_factor: Dict[str, Any] = {}
-                if isinstance(res, list) and res:
-                    parsed_factor = res[0] if isinstance(res[0], dict) else {}
-                elif isinstance(res, dict):
-                    parsed_factor = res
-
-                # try common keys
-                value = parsed_factor.get(factor)
-                if value is None:
-                    value = parsed_factor.get("value") or parsed_factor.get("score") or parsed_factor.get("result")
+            raw_search_snippets = await self._search_all_factors(lead)
+
+            # One call covers every factor: lead info and snippets are sent once, not per factor
+            prompt = self._build_prompt(lead, orjson.dumps(raw_search_snippets).decode())
+            try:
+                bundle = self._parse_bundle(await self._call_llm(prompt, maxTokens=2000))
+            except Exception as e:
+                logger.warning("LLM assessment failed for %s: %r", lead.company_name, e)
+                bundle = FactorBundle()
 
+            for factor in self.FACTOR_KEYS:
+                value = getattr(bundle, factor)
                 if value is not None:
                     assessment[factor] = value
 
-                if parsed_factor.get("rationale"):
-                    rationales[factor] = parsed_factor.get("rationale")
+            if bundle.lead_score is not None:
+                assessment["lead_score"] = int(max(0, min(100, round(bundle.lead_score))))
+            if bundle.rationale:
+                assessment["rationale"] = bundle.rationale
+
+            # Fall back to per-factor estimates only for what the combined answer left out
+            missing = [factor for factor in self.FACTOR_KEYS if factor not in assessment]
+            estimates = await asyncio.gather(
+                *(self._estimate_factor_with_llm(lead, factor, raw_search_snippets[factor]) for factor in missing)
+            )
+            for factor, estimate in zip(missing, estimates):
+                value = getattr(estimate, factor)
+                if value is not None:
+                    assessment[factor] = value
+                if estimate.rationale:
+                    rationales[factor] = estimate.rationale
 
             # normalize numeric types and compute final score if missing
             numeric_scores = []
-            for k in [
-                "integration_readiness_score",
-                "transaction_intent_score",
-                "digital_maturity_score",
-                "web_presence_quality",
-                "fraud_risk_pattern_score",
-                "traffic_check",
-                "brand_search_volume",
-            ]:
-                v = assessment.get(k)
-                try:
-                    if v is None:
-                        continue
-                    fv = float(v)
-                    fv = max(0.0, min(1.0, fv))
+            for k in self.SCORE_KEYS:
+                fv = _unit_score(assessment.get(k))
+                if fv is not None:
                     assessment[k] = fv
                     numeric_scores.append(fv)
-                except Exception:
-                    continue
 
             if "lead_score" not in assessment:
                 assessment["lead_score"] = int(round((sum(numeric_scores) / len(numeric_scores)) * 100)) if numeric_scores else 0
@@ -271,50 +534,120 @@ class LeadAssessor:
             logger.exception("Failed to assess lead %s: %s", lead.company_name, e)
             return {"error": str(e)}
 
+    def persist_assessment_nocommit(self, lead: Lead, assessment: Dict[str, Any]) -> None:
+        """Apply an assessment to a lead in the current transaction without committing."""
+        # attach assessment to raw_data (merge with existing JSON if present)
+        # a new dict is assigned so the JSON column is flagged as changed
+        if isinstance(lead.raw_data, dict):
+            existing = dict(lead.raw_data)
+        else:
+            existing = {"raw": lead.raw_data} if lead.raw_data else {}
+
+        existing["assessment"] = assessment
+        lead.raw_data = existing
+
+        # update lead_score if present
+        if isinstance(assessment.get("lead_score"), (int, float)):
+            lead.lead_score = float(assessment.get("lead_score"))
+
+        # lead was loaded through self.session, so the changes above are already tracked
+        lead.status = "assessed"
+
     def persist_assessment(self, lead: Lead, assessment: Dict[str, Any]) -> None:
         try:
-            # attach assessment to raw_data (merge with existing JSON if present)
-            existing = {}
-            if lead.raw_data:
-                try:
-                    existing = json.loads(lead.raw_data)
-                except Exception:
-                    existing = {"raw": lead.raw_data}
-
-            existing["assessment"] = assessment
-            lead.raw_data = json.dumps(existing, ensure_ascii=False)
-
-            # update lead_score if present
-            if isinstance(assessment.get("lead_score"), (int, float)):
-                lead.lead_score = float(assessment.get("lead_score"))
-
-            lead.status = "assessed"
-            self.session.add(lead)
+            self.persist_assessment_nocommit(lead, assessment)
             self.session.commit()
         except Exception:
             self.session.rollback()
             logger.exception("Failed to persist assessment for lead %s", lead.company_name)
 
-    def assess_all_leads(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Assess all leads (or up to `limit`) and persist results. Returns list of assessments."""
-        q = self.session.query(Lead).filter(Lead.status != "assessed").order_by(Lead.created_at)
+    def _commit_batch(self, leads: List[Lead]) -> None:
+        """Commit pending assessments in one transaction; on failure the whole batch is rolled back."""
+        try:
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            logger.exception(
+                "Failed to persist assessments for %d leads: %s",
+                len(leads), ", ".join(str(lead.company_name) for lead in leads),
+            )
+
+    def persist_assessments(self, results: List[tuple]) -> None:
+        """Persist (lead, assessment) pairs, committing once per PERSIST_BATCH_SIZE leads."""
+        pending: List[Lead] = []
+        for lead, assessment in results:
+            try:
+                self.persist_assessment_nocommit(lead, assessment)
+            except Exception:
+                logger.exception("Failed to persist assessment for lead %s", lead.company_name)
+                continue
+            pending.append(lead)
+            if len(pending) >= self.PERSIST_BATCH_SIZE:
+                self._commit_batch(pending)
+                pending = []
+        if pending:
+            self._commit_batch(pending)
+
+    async def assess_leads_async(self, leads: List[Lead]) -> List[Dict[str, Any]]:
+        """Assess leads concurrently, then persist them in one pass. Returns list of assessments.
+
+        assess_lead_async only reads already-loaded attributes, so leads can overlap;
+        the Session is used from one worker thread at a time.
+        """
+        semaphore = asyncio.Semaphore(self.MAX_PARALLEL_LEADS)
+
+        async def _assess_one(lead: Lead) -> Dict[str, Any]:
+            async with semaphore:
+                assessment = await self.assess_lead_async(lead)
+            return {"lead_id": lead.id, "company_name": lead.company_name, "assessment": assessment}
+
+        results = await asyncio.gather(*(_assess_one(lead) for lead in leads))
+        await asyncio.to_thread(
+            self.persist_assessments, [(lead, r["assessment"]) for lead, r in zip(leads, results)]
+        )
+        return list(results)
+
+    def _pending_lead_ids(self, limit: Optional[int]) -> List[int]:
+        q = self.session.query(Lead.id).filter(Lead.status != "assessed").order_by(Lead.created_at)
         if limit:
             q = q.limit(limit)
-        leads = q.all()
+        return [lead_id for (lead_id,) in q]
+
+    def _load_page(self, lead_ids: List[int]) -> List[Lead]:
+        leads_by_id = {lead.id: lead for lead in self.session.query(Lead).filter(Lead.id.in_(lead_ids))}
+        return [leads_by_id[lead_id] for lead_id in lead_ids if lead_id in leads_by_id]
+
+    async def assess_all_leads_async(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Assess all leads (or up to `limit`) and persist results. Returns list of assessments.
+
+        Only the ids of pending leads are read up front; full rows are loaded, assessed
+        and committed one PERSIST_BATCH_SIZE page at a time.
+        """
+        lead_ids = await asyncio.to_thread(self._pending_lead_ids, limit)
         results = []
-        for lead in leads:
-            assessment = self.assess_lead(lead)
-            self.persist_assessment(lead, assessment)
-            results.append({"lead_id": lead.id, "company_name": lead.company_name, "assessment": assessment})
+        for start in range(0, len(lead_ids), self.PERSIST_BATCH_SIZE):
+            leads = await asyncio.to_thread(self._load_page, lead_ids[start:start + self.PERSIST_BATCH_SIZE])
+            results.extend(await self.assess_leads_async(leads))
+        logger.info(
+            "Assessed %d leads; Serper cache hits=%d misses=%d",
+            len(results), self.serp.cache_hits, self.serp.cache_misses,
+        )
         return results
 
+    def assess_all_leads(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Synchronous wrapper around `assess_all_leads_async` for the CLI."""
+        return self._run_sync(self.assess_all_leads_async(limit))
 
 if __name__ == "__main__":
     # Simple CLI invocation for local runs
+    LeadAssessor.configure_logging()
     db_url = os.environ.get("DATABASE_URL")
     if not db_url:
         print("Please set DATABASE_URL environment variable to run the assessor")
     else:
         assessor = LeadAssessor(db_url=db_url)
-        out = assessor.assess_all_leads(limit=1)
+        try:
+            out = assessor.assess_all_leads(limit=1)
+        finally:
+            assessor.close()
         print(json.dumps(out, indent=2, ensure_ascii=False))
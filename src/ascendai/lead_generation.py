@@ -1,23 +1,34 @@
-import json
 import time
+import orjson
+import asyncio
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import requests
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, List, Dict, Optional, Tuple, Union
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float
+from sqlalchemy import create_engine, event, func, insert, select, Column, Integer, String, Text, DateTime, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 import ssl
 ssl._create_default_https_context = ssl._create_unverified_context
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser as HTMLParser
 import re
-from urllib.parse import urlparse
-import hashlib
-from pathlib import Path
-from playwright.sync_api import sync_playwright
-import html2text
-from llm import BedrockLLM
+from urllib.parse import urlsplit, urlunsplit
+from playwright.async_api import async_playwright
+from aiolimiter import AsyncLimiter
+from llm import get_llm
+from kv_cache import get_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 load_dotenv(override=True)
 
@@ -27,10 +38,73 @@ print(os.environ['AWS_BEARER_TOKEN_BEDROCK'])
 # SQLAlchemy setup
 from models import Lead, SearchQuery, Base
 
+# Search queries used to find PayU leads
+_SEARCH_QUERIES: Tuple[str, ...] = (
+    # New companies/startups
+    "new fintech startups 2024 2025 funding rounds",
+    "e-commerce startups launched 2024 payment needs",
+    "SaaS companies seeking payment integration",
+    "marketplace platforms payment gateway",
+
+    # Companies using competitors
+    "companies using Stripe payment gateway",
+    "Razorpay merchant integration news",
+    "PayPal business integration announcement",
+    "Square payment processing new clients",
+
+    # Industry-specific
+    "online education platforms payment solutions",
+    "telemedicine healthcare payment gateway",
+    "food delivery apps payment integration",
+    "travel booking payment processing",
+
+    # Growth signals
+    "companies raising series A payment infrastructure",
+    "digital transformation payment gateway adoption",
+    "cross-border payment solution needs",
+    "subscription business payment automation",
+)
+
+# Absolute URL prefix; checked with match() so a '://' inside a query string doesn't count
+_SCHEME_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*://')
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets API readers run during generation; NORMAL sync skips the fsync on every commit"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
 class PayULeadGenerator:
     """
     AI-powered lead generation system using AWS Bedrock and SQLite
     """
+
+    SERPER_ENDPOINT = "https://google.serper.dev/search"
+    # Namespaces in the shared KV cache. Serper results and rendered page text are reused
+    # across queries and reruns until they go stale; LLM responses are cached by BedrockLLM
+    SERPER_CACHE = "serper"
+    SERPER_CACHE_TTL_SECONDS = 24 * 3600
+    PAGE_CACHE = "pages"
+    PAGE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+    # Concurrent Serper searches per run, and the request rate they are paced to
+    MAX_PARALLEL_SEARCHES = 5
+    SERPER_RPS = 5
+    # Uncached queries are sent as one JSON array per request, up to Serper's batch limit
+    SERPER_BATCH_SIZE = 100
+
+    # Maximum number of pages fetched or rendered at once
+    MAX_PARALLEL_PAGES = 8
+    # Plain HTTP responses with at least this much visible text skip the headless browser
+    STATIC_PAGE_MIN_TEXT = 1500
+    JS_REQUIRED_MARKERS = ("enable javascript", "requires javascript", "javascript is required", "javascript is disabled")
+    BLOCK_TAGS = "p, div, li, br, tr, h1, h2, h3, h4, h5, h6, section, article, header, footer, nav, aside, blockquote, pre"
+    # Concurrent Bedrock extraction calls per query, and pages sent in each call
+    MAX_PARALLEL_EXTRACTIONS = 8
+    EXTRACTION_BATCH_SIZE = 4
     
     def __init__(self, db_path: str = "payu_leads.db", aws_region: str = "us-east-1"):
         """
@@ -41,44 +115,47 @@ class PayULeadGenerator:
             aws_region: AWS region for Bedrock service
         """
         # Initialize AWS Bedrock
-        self.bedrock = BedrockLLM()
+        self.bedrock = get_llm()
+        self._cache = get_cache()
         
         # Initialize SQLite database
         self.engine = create_engine(f'sqlite:///{db_path}', echo=False)
+        event.listen(self.engine, "connect", _set_sqlite_pragmas)
         Base.metadata.create_all(self.engine)
+        # create_all skips existing tables, so add indexes introduced since the table was created
+        for index in Lead.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
         Session = sessionmaker(bind=self.engine)
         self.session = Session()
+
+        # One pooled HTTP session for Serper and page fetches so connections are kept alive
+        self._http = requests.Session()
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"GET", "POST"}),
+        )
+        self._http.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retries))
+        self._http.headers.update({'User-Agent': 'PayU-LeadBot/1.0'})
+
+        # Leads extracted per normalized URL during this generator's lifetime, so a URL
+        # returned by several queries is scraped and sent to the LLM only once
+        self._url_leads_cache: Dict[str, List[Dict]] = {}
+
+        # Async work runs on one loop owned by the generator so the headless browser,
+        # launched on first scrape, is reused by every query until close()
+        self._loop = asyncio.new_event_loop()
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = asyncio.Lock()
         
         print(f"✅ Initialized with database: {db_path}")
         # print(f"✅ Using AWS Bedrock model: {self.model_id}")
     
     def search_queries(self) -> List[str]:
         """Define search queries to find PayU leads"""
-        return [
-            # New companies/startups
-            "new fintech startups 2024 2025 funding rounds",
-            "e-commerce startups launched 2024 payment needs",
-            "SaaS companies seeking payment integration",
-            "marketplace platforms payment gateway",
-            
-            # Companies using competitors
-            "companies using Stripe payment gateway",
-            "Razorpay merchant integration news",
-            "PayPal business integration announcement",
-            "Square payment processing new clients",
-            
-            # Industry-specific
-            "online education platforms payment solutions",
-            "telemedicine healthcare payment gateway",
-            "food delivery apps payment integration",
-            "travel booking payment processing",
-            
-            # Growth signals
-            "companies raising series A payment infrastructure",
-            "digital transformation payment gateway adoption",
-            "cross-border payment solution needs",
-            "subscription business payment automation"
-        ]
+        return list(_SEARCH_QUERIES)
     
     def search_with_serper(self, query: str) -> Dict:
         """
@@ -90,45 +167,140 @@ class PayULeadGenerator:
         Returns:
             Dict containing search results from Serper API
         """
-        url = "https://google.serper.dev/search"
+        return self._search_with_serper(query)[1]
 
-        # simple file cache for serper responses
-        cache_dir = Path("cache/serper")
-        cache_dir.mkdir(parents=True, exist_ok=True)
-        qhash = hashlib.sha256(query.encode('utf-8')).hexdigest()
-        cache_file = cache_dir / f"{qhash}.json"
+    def search_with_serper_raw(self, query: str) -> bytes:
+        """
+        Serper search returning the JSON body unparsed, for callers that forward
+        or embed it as-is; b"{}" when the search fails
+        """
+        return self._search_with_serper(query)[0]
 
-        # return cached response if present
-        if cache_file.exists():
-            try:
-                with cache_file.open('r', encoding='utf-8') as fh:
-                    return json.load(fh)
-            except Exception as e:
-                print(f"⚠️ Failed to read cache for query: {e}")
+    def _search_with_serper(self, query: str) -> Tuple[bytes, Dict]:
+        """
+        Shared body of the Serper search variants: the response bytes plus the dict
+        parsed while validating them (or memoized with a cache hit), so neither
+        variant decodes a body twice; (b"{}", {}) when the search fails
+        """
+        cached = self._read_serper_cache_entry(query)
+        if cached is not None:
+            return cached
 
-        payload = json.dumps({
-            "q": query
-        })
+        try:
+            response = self._http.post(self.SERPER_ENDPOINT, headers=self._serper_headers(), json={"q": query}, timeout=30)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Serper API error: {e}")
+            return b"{}", {}
+        if 'json' not in response.headers.get('Content-Type', ''):
+            print(f"⚠️ Serper API error: unexpected content type {response.headers.get('Content-Type')!r}")
+            return b"{}", {}
+        # Only a body that parses is cached, so a truncated or HTML error page is never replayed
+        try:
+            parsed = orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            print(f"⚠️ Serper API error: {e}")
+            return b"{}", {}
+        self._write_serper_cache(query, response.content)
+        return response.content, parsed
 
-        headers = {
-            'X-API-KEY': os.environ.get('SERPER_API_KEY', 'a82e506a1d9965b424c351f90e0396952b5d3c10'),
-            'Content-Type': 'application/json'
-        }
+    async def _serper_async(self, client: httpx.AsyncClient, limiter: AsyncLimiter, semaphore: asyncio.Semaphore, query: str) -> Dict:
+        """Async variant of `search_with_serper`, sharing its cache."""
+        cached = self._read_serper_cache(query)
+        if cached is not None:
+            return cached
 
         try:
-            response = requests.post(url, headers=headers, data=payload, timeout=30)
+            async with semaphore, limiter:
+                response = await client.post(self.SERPER_ENDPOINT, headers=self._serper_headers(), json={"q": query})
             response.raise_for_status()
-            data = response.json()
-            # save to cache (best-effort)
-            try:
-                with cache_file.open('w', encoding='utf-8') as fh:
-                    json.dump(data, fh)
-            except Exception as e:
-                print(f"⚠️ Failed to write cache file: {e}")
+            data = orjson.loads(response.content)
+            self._write_serper_cache(query, response.content)
             return data
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
             print(f"⚠️ Serper API error: {e}")
             return {}
+
+    async def _serper_batch_async(self, client: httpx.AsyncClient, limiter: AsyncLimiter, semaphore: asyncio.Semaphore, queries: List[str]) -> Optional[List[Dict]]:
+        """Search several queries in one Serper request; None if the batch call fails."""
+        try:
+            async with semaphore, limiter:
+                response = await client.post(self.SERPER_ENDPOINT, headers=self._serper_headers(), json=[{"q": q} for q in queries])
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            print(f"⚠️ Serper batch error: {e}")
+            return None
+        if not isinstance(data, list) or len(data) != len(queries):
+            print(f"⚠️ Unexpected Serper batch response, searching queries one by one")
+            return None
+        for query, result in zip(queries, data):
+            self._write_serper_cache(query, orjson.dumps(result))
+        return data
+
+    async def _search_all(self, queries: List[str]) -> List[Dict]:
+        """Run all Serper searches; results are returned in query order.
+
+        Cached queries are answered without a request, the rest go out in batches of
+        SERPER_BATCH_SIZE. Queries from a failed batch are retried one by one, concurrently.
+        """
+        results: List[Optional[Dict]] = [self._read_serper_cache(q) for q in queries]
+        misses = [i for i, cached in enumerate(results) if cached is None]
+        if not misses:
+            return results
+
+        limiter = AsyncLimiter(self.SERPER_RPS, 1)
+        semaphore = asyncio.Semaphore(self.MAX_PARALLEL_SEARCHES)
+        async with httpx.AsyncClient(timeout=30) as client:
+            chunks = [misses[i:i + self.SERPER_BATCH_SIZE] for i in range(0, len(misses), self.SERPER_BATCH_SIZE)]
+            batches = await asyncio.gather(*(
+                self._serper_batch_async(client, limiter, semaphore, [queries[i] for i in chunk]) for chunk in chunks
+            ))
+            retry = []
+            for chunk, batch in zip(chunks, batches):
+                if batch is None:
+                    retry.extend(chunk)
+                    continue
+                for i, result in zip(chunk, batch):
+                    results[i] = result
+            singles = await asyncio.gather(*(self._serper_async(client, limiter, semaphore, queries[i]) for i in retry))
+            for i, result in zip(retry, singles):
+                results[i] = result
+        return results
+
+    def search_many(self, queries: List[str]) -> List[Dict]:
+        """Search Serper for several queries at once; results are returned in query order."""
+        return self._run(self._search_all(queries)) if queries else []
+
+    def _serper_headers(self) -> Dict[str, str]:
+        # API key is sent per request so it never leaks to scraped sites via the shared session
+        return {
+            'X-API-KEY': os.environ.get('SERPER_API_KEY', 'a82e506a1d9965b424c351f90e0396952b5d3c10'),
+        }
+
+    def _read_serper_cache_entry(self, query: str) -> Optional[Tuple[bytes, Dict]]:
+        """Return the cached Serper response for a query as (body, parsed), if present"""
+        try:
+            return _memo_serper_entry(query, int(time.time() // _SERPER_MEMO_WINDOW_SECONDS))
+        except KeyError:
+            return None
+        except orjson.JSONDecodeError as e:
+            print(f"⚠️ Failed to read cache for query: {e}")
+            return None
+
+    def _read_serper_cache(self, query: str) -> Optional[Dict]:
+        """Return the cached Serper response for a query, if present"""
+        entry = self._read_serper_cache_entry(query)
+        return entry[1] if entry is not None else None
+
+    def _write_serper_cache(self, query: str, body: bytes) -> None:
+        # Store the response body as received; it already parsed, so no re-serialization is needed
+        self._cache.set(self.SERPER_CACHE, query, body, expire=self.SERPER_CACHE_TTL_SECONDS)
+
+    def _read_page_cache(self, url: str) -> Optional[str]:
+        """Return cached page text for a URL unless missing or older than PAGE_CACHE_TTL_SECONDS"""
+        cached = self._cache.get(self.PAGE_CACHE, url)
+        return cached.decode('utf-8') if cached is not None else None
     
     def format_search_results(self, serper_response: Dict) -> str:
         """
@@ -175,45 +347,130 @@ class PayULeadGenerator:
             'User-Agent': 'Mozilla/5.0 (compatible; PayU-LeadBot/1.0; +https://payu.in)'
         }
         try:
-            resp = requests.get(url, headers=headers, timeout=timeout)
+            resp = self._http.get(url, headers=headers, timeout=timeout)
             resp.raise_for_status()
             return resp.text
         except requests.RequestException as e:
             print(f"⚠️ Failed to fetch {url}: {e}")
             return None
 
-    def _get_page_text_from_url(self, url: str) -> str:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, args=["--no-sandbox"])
-            page = browser.new_page()
-
-            page.goto(url, wait_until="domcontentloaded")
-
-            html = page.content()
-            browser.close()
-
-        soup = BeautifulSoup(html, "html.parser")
-
-        # print(soup_to_raw_data(soup))
-        # return
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
-
-        cleaned_html = soup.prettify()
-
-        markdown = html2text.html2text(cleaned_html)
-        return markdown
+    async def _get_page_html_async(self, browser, url: str) -> str:
+        """Render a single URL in its own browser context and return the HTML."""
+        context = await browser.new_context()
+        try:
+            page = await context.new_page()
+            await page.goto(url, wait_until="domcontentloaded", timeout=15000)
+            return await page.content()
+        finally:
+            await context.close()
+
+    def _run(self, coro):
+        """Run a coroutine to completion on the generator's event loop."""
+        return self._loop.run_until_complete(coro)
+
+    async def _get_browser(self):
+        """Launch Chromium on first use and keep it for the generator's lifetime."""
+        async with self._browser_lock:
+            if self._browser is not None and not self._browser.is_connected():
+                print("⚠️ Browser disconnected; relaunching")
+                await self._close_browser()
+            if self._browser is None:
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=True, args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"]
+                )
+            return self._browser
+
+    async def _close_browser(self):
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        finally:
+            self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    def _is_static_page(self, html: str) -> bool:
+        """True when server-rendered HTML already carries the page text, so no JS rendering is needed"""
+        tree = HTMLParser(html)
+        noscript = " ".join(node.text() for node in tree.css("noscript")).lower()
+        if any(marker in noscript for marker in self.JS_REQUIRED_MARKERS):
+            return False
+        return len(self._html_to_text(tree)) >= self.STATIC_PAGE_MIN_TEXT
+
+    async def _scrape_all(self, urls: List[str]) -> List[str]:
+        """
+        Fetch all URLs concurrently, rendering in the shared Chromium instance only when needed
+        
+        Each URL is first fetched over plain HTTP; pages that come back thin or JS-gated are
+        rendered in the browser. Returns the HTML for each URL in order, or an empty string
+        when a page fails to load.
+        """
+        semaphore = asyncio.Semaphore(self.MAX_PARALLEL_PAGES)
+
+        async def bounded(url: str) -> str:
+            async with semaphore:
+                html = await asyncio.to_thread(self.fetch_page_content, url, 10)
+                if html and self._is_static_page(html):
+                    return html
+                try:
+                    browser = await self._get_browser()
+                    return await self._get_page_html_async(browser, url)
+                except Exception as e:
+                    print(f"⚠️ Failed to scrape {url}: {e}")
+                    return ""
+
+        return await asyncio.gather(*(bounded(u) for u in urls))
+
+    def _get_page_texts(self, urls: List[str]) -> List[str]:
+        """
+        Return page markdown for each URL, rendering only pages missing from the page cache
+        
+        Pages that fail to load come back as empty strings and are not cached.
+        """
+        texts = [self._read_page_cache(u) for u in urls]
+        misses = [u for u, text in zip(urls, texts) if text is None]
+        if not misses:
+            return texts
+
+        print(f"🤖 Scraping {len(misses)} webpages ({len(urls) - len(misses)} cached)...")
+        htmls = self._run(self._scrape_all(misses))
+
+        # Parse outside the event loop
+        scraped = {}
+        for u, html in zip(misses, htmls):
+            text = self._html_to_text(html) if html else ""
+            if text:
+                self._cache.set(self.PAGE_CACHE, u, text.encode('utf-8'), expire=self.PAGE_CACHE_TTL_SECONDS)
+            scraped[u] = text
+        return [scraped[u] if text is None else text for u, text in zip(urls, texts)]
 
-    def extract_companies_from_url(self, url: str) -> List[Dict]:
+    def _get_page_text_from_url(self, url: str) -> str:
+        return self._get_page_texts([url])[0]
+
+    def _html_to_text(self, html: Union[str, HTMLParser]) -> str:
+        """Visible page text, one block per line with repeated lines (nav, footers) dropped."""
+        tree = HTMLParser(html) if isinstance(html, str) else html
+        for node in tree.css("script, style, noscript"):
+            node.decompose()
+        if tree.body is None:
+            return ""
+        # Break lines at block elements only, so inline markup stays within its sentence
+        for node in tree.body.css(self.BLOCK_TAGS):
+            node.insert_after("\n")
+        lines = (line.strip() for line in tree.body.text(separator="").splitlines())
+        return "\n".join(dict.fromkeys(line for line in lines if line))
+
+    def extract_companies_from_url(self, url: str, page_text: Optional[str] = None) -> List[Dict]:
         """Use Bedrock LLM to parse page content and extract structured leads.
 
         Falls back to simple on-page heuristics when the LLM call fails or returns
-        invalid output.
+        invalid output. Pass `page_text` when the page was already scraped.
         """
-        print(f"🤖 Scraping webpage: {url}")
-
-        # TODO: Read page text from url
-        page_text = self._get_page_text_from_url(url)
+        if page_text is None:
+            print(f"🤖 Scraping webpage: {url}")
+            page_text = self._get_page_text_from_url(url)
 
         # Truncate to ~12000 characters to keep request size reasonable
         truncated = page_text[:12000]
@@ -230,38 +487,93 @@ class PayULeadGenerator:
 
         try:
             leads = self.bedrock.generate_json(prompt, maxTokens=2000)
-
-            # Ensure proper structure & defaults
-            valid = []
-            for item in (leads if isinstance(leads, list) else []):
-                if not isinstance(item, dict):
-                    continue
-                item.setdefault('company_name', '')
-                item.setdefault('industry', '')
-                item.setdefault('description', '')
-                item.setdefault('why_payu', '')
-                item.setdefault('source_url', url)
-                item.setdefault('company_size', '')
-                item.setdefault('lead_score', 0)
-                valid.append(item)
-
+            valid = self._validate_leads(leads, url)
             if valid:
                 return valid
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"⚠️ LLM returned non-JSON content for {url}: {e}")
         except Exception as e:
             print(f"⚠️ LLM extraction failed for {url}: {e}")
-        return leads
+        return []
+
+    def extract_companies_from_urls(self, urls_and_texts: List[Tuple[str, str]]) -> List[List[Dict]]:
+        """Extract leads for several scraped pages with a single LLM call.
+
+        Returns one list of leads per input page, in order. If the reply does not
+        hold exactly one array per page, the batch is retried page by page.
+        """
+        results: List[List[Dict]] = [[] for _ in urls_and_texts]
+        pending = [(i, url, page_text[:12000]) for i, (url, page_text) in enumerate(urls_and_texts)]
+
+        if len(pending) == 1:
+            i, url, _ = pending[0]
+            results[i] = self.extract_companies_from_url(url, page_text=urls_and_texts[i][1])
+        elif pending:
+            sections = "\n---\n".join(
+                f"PAGE_{n} (url={url}):\n{truncated}" for n, (_, url, truncated) in enumerate(pending, 1)
+            )
+            prompt = (
+                f"You are a professional lead finder agent. Below are {len(pending)} pages, PAGE_1 to PAGE_{len(pending)}. "
+                "For each PAGE, extract company leads mentioned or clearly described on it. "
+                "Return ONLY a JSON array of arrays: one array per PAGE, in PAGE order, each holding objects with "
+                "these keys: company_name, industry, description, why_payu, source_url, company_size, lead_score (0-100). "
+                "Use an empty array for a page with no companies. Use the page content to infer fields; be concise."
+                "\n\n" + sections
+            )
+            try:
+                batch = self.bedrock.generate_json(prompt, maxTokens=2000 * len(pending))
+            except Exception as e:
+                print(f"⚠️ Batched LLM extraction failed: {e}")
+                batch = None
+
+            if isinstance(batch, list) and len(batch) == len(pending) and all(isinstance(b, list) for b in batch):
+                for (i, url, _), leads in zip(pending, batch):
+                    results[i] = self._validate_leads(leads, url)
+            else:
+                print(f"⚠️ Batched extraction did not return {len(pending)} arrays; retrying page by page")
+                for i, url, _ in pending:
+                    results[i] = self.extract_companies_from_url(url, page_text=urls_and_texts[i][1])
+        return results
+
+    def _validate_leads(self, leads: Any, url: str) -> List[Dict]:
+        """Keep dict items from an LLM reply and fill in missing fields."""
+        # Ensure proper structure & defaults
+        valid = []
+        for item in (leads if isinstance(leads, list) else []):
+            if not isinstance(item, dict):
+                continue
+            item.setdefault('company_name', '')
+            item.setdefault('industry', '')
+            item.setdefault('description', '')
+            item.setdefault('why_payu', '')
+            item.setdefault('source_url', url)
+            item.setdefault('company_size', '')
+            item.setdefault('lead_score', 0)
+            valid.append(item)
+        return valid
     
-    def call_bedrock_with_search(self, query: str) -> Dict:
+    @staticmethod
+    def _normalize_url(url: str) -> str:
+        """Canonical form used to dedupe URLs: https default, lowercased scheme/host, no fragment"""
+        if not _SCHEME_RE.match(url):
+            url = 'https://' + url
+        parts = urlsplit(url)
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ''))
+
+    def call_bedrock_with_search(self, query: str, serper_results: Optional[Dict] = None) -> Dict:
         """
         Call AWS Bedrock Claude with real web search results from Serper API
+        
+        Args:
+            query: The search query string
+            serper_results: Pre-fetched Serper response; searched here when omitted
         """
         print(f"\n🔍 Processing query: {query}")
         
         # Step 1: Perform web search using Serper API
-        print(f"🌐 Searching the web with Serper API...")
-        serper_results = self.search_with_serper(query)
+        if serper_results is None:
+            print(f"🌐 Searching the web with Serper API...")
+            serper_results = self.search_with_serper(query)
         
         if not serper_results:
             print("⚠️ No search results returned from Serper, proceeding with query-based generation")
@@ -277,29 +589,38 @@ class PayULeadGenerator:
             if link:
                 urls.append(link)
 
-        scraped_leads = []
-        visited = set()
+        targets = []
         for u in urls:
-            # normalize
             try:
-                parsed = urlparse(u)
-                if not parsed.scheme:
-                    u = 'https://' + u
-            except Exception:
-                pass
-            if u in visited:
+                u = self._normalize_url(u)
+            except ValueError:
                 continue
-            visited.add(u)
-
-            # html = self.fetch_page_content(u)
-            # if not html:
-            #     continue
+            if u not in targets:
+                targets.append(u)
+
+        # URLs already handled by an earlier query in this run are not scraped again
+        new_targets = [u for u in targets if u not in self._url_leads_cache]
+        if len(new_targets) < len(targets):
+            print(f"♻️ Reusing leads for {len(targets) - len(new_targets)} URLs seen earlier in this run")
+
+        # Render every uncached page in one browser, then extract outside the event loop
+        page_texts = self._get_page_texts(new_targets) if new_targets else []
+        pages = [(u, text) for u, text in zip(new_targets, page_texts) if text]
+        for u in new_targets:
+            self._url_leads_cache[u] = []
+
+        # Several pages per Bedrock call; calls are network-bound and the shared boto3 client is thread-safe
+        batches = [pages[i:i + self.EXTRACTION_BATCH_SIZE] for i in range(0, len(pages), self.EXTRACTION_BATCH_SIZE)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.MAX_PARALLEL_EXTRACTIONS, len(batches))) as executor:
+                for batch, extracted in zip(batches, executor.map(self.extract_companies_from_urls, batches)):
+                    for (u, _), leads in zip(batch, extracted):
+                        self._url_leads_cache[u] = leads
 
-            leads = self.extract_companies_from_url(u)
-            # attach search query context
-            for lead in leads:
-                lead['search_query'] = query
-            scraped_leads.extend(leads)
+        scraped_leads = []
+        for u in targets:
+            # copy so the search_query tag stays per query
+            scraped_leads.extend({**lead, 'search_query': query} for lead in self._url_leads_cache[u])
 
         print(f"✅ Extracted {len(scraped_leads)} candidate leads from scraped pages")
 
@@ -315,25 +636,61 @@ class PayULeadGenerator:
         return {
             'query': query,
             'leads': list(unique.values()),
-            'raw_response': json.dumps(serper_results),
+            'raw_response': serper_results,
             'search_results': serper_results
         }
     
+    def _lead_row(self, lead_data: Dict, search_query: str) -> Dict:
+        """Map an extracted lead to Lead column values"""
+        return dict(
+            company_name=lead_data.get('company_name', 'Unknown'),
+            industry=lead_data.get('industry', ''),
+            description=lead_data.get('description', ''),
+            why_payu=lead_data.get('why_payu', ''),
+            source_url=lead_data.get('source_url', ''),
+            company_size=lead_data.get('company_size', ''),
+            search_query=search_query,
+            lead_score=float(lead_data.get('lead_score', 0)),
+            raw_data=lead_data
+        )
+
+    def save_leads_to_db(self, leads: List[Dict], search_query: str) -> int:
+        """
+        Save a batch of leads with one INSERT and one commit
+        
+        Falls back to row-by-row saves if the batch fails, so one bad lead does not drop the rest.
+        Returns the number of leads saved.
+        """
+        rows = []
+        for lead_data in leads:
+            try:
+                rows.append(self._lead_row(lead_data, search_query))
+            except (TypeError, ValueError) as e:
+                print(f"❌ Error saving lead: {e}")
+        if not rows:
+            return 0
+
+        try:
+            self.session.execute(insert(Lead), rows)
+            self.session.commit()
+            return len(rows)
+        except Exception as e:
+            print(f"⚠️ Bulk insert failed, saving leads one by one: {e}")
+            self.session.rollback()
+        return sum(1 for row in rows if self._save_lead_row(row))
+
     def save_lead_to_db(self, lead_data: Dict, search_query: str) -> Optional[Lead]:
         """Save a lead to the database"""
         try:
-            lead = Lead(
-                company_name=lead_data.get('company_name', 'Unknown'),
-                industry=lead_data.get('industry', ''),
-                description=lead_data.get('description', ''),
-                why_payu=lead_data.get('why_payu', ''),
-                source_url=lead_data.get('source_url', ''),
-                company_size=lead_data.get('company_size', ''),
-                search_query=search_query,
-                lead_score=float(lead_data.get('lead_score', 0)),
-                raw_data=json.dumps(lead_data)
-            )
-            
+            row = self._lead_row(lead_data, search_query)
+        except (TypeError, ValueError) as e:
+            print(f"❌ Error saving lead: {e}")
+            return None
+        return self._save_lead_row(row)
+
+    def _save_lead_row(self, row: Dict) -> Optional[Lead]:
+        try:
+            lead = Lead(**row)
             self.session.add(lead)
             self.session.commit()
             return lead
@@ -342,7 +699,7 @@ class PayULeadGenerator:
             self.session.rollback()
             return None
     
-    def save_search_query(self, query: str, leads_count: int, raw_response: str):
+    def save_search_query(self, query: str, leads_count: int, raw_response: Optional[Dict]):
         """Save search query metadata"""
         try:
             sq = SearchQuery(
@@ -362,7 +719,7 @@ class PayULeadGenerator:
         
         Args:
             max_queries: Maximum number of queries to process
-            delay: Delay in seconds between queries
+            delay: Unused; Serper calls are now paced by SERPER_RPS. Kept for existing callers.
         """
         queries = self.search_queries()[:max_queries]
         
@@ -374,23 +731,24 @@ class PayULeadGenerator:
         
         total_leads = 0
         successful_queries = 0
+
+        # Search every query up front; latency is the slowest search rather than the sum
+        print(f"🌐 Searching the web with Serper API...")
+        search_results = self.search_many(queries)
         
-        for i, query in enumerate(queries, 1):
+        for i, (query, serper_results) in enumerate(zip(queries, search_results), 1):
             print(f"\n{'='*70}")
             print(f"Query {i}/{len(queries)}: {query}")
             print(f"{'='*70}")
             
-            result = self.call_bedrock_with_search(query)
+            result = self.call_bedrock_with_search(query, serper_results=serper_results)
             leads = result.get('leads', [])
             
             # Save search query
-            self.save_search_query(query, len(leads), result.get('raw_response', ''))
+            self.save_search_query(query, len(leads), result.get('raw_response'))
             
             # Save leads to database
-            saved_count = 0
-            for lead_data in leads:
-                if self.save_lead_to_db(lead_data, query):
-                    saved_count += 1
+            saved_count = self.save_leads_to_db(leads, query)
             
             print(f"✅ Found {len(leads)} leads, saved {saved_count} to database")
             
@@ -400,11 +758,6 @@ class PayULeadGenerator:
                 print("\n📋 Sample leads:")
                 for lead in leads[:2]:
                     print(f"  • {lead.get('company_name')}: {lead.get('why_payu', '')[:60]}...")
-            
-            # Rate limiting
-            if i < len(queries):
-                print(f"\n⏳ Waiting {delay} seconds...")
-                time.sleep(delay)
         
         return {
             'total_queries': len(queries),
@@ -427,10 +780,13 @@ class PayULeadGenerator:
     
     def generate_report(self) -> str:
         """Generate a comprehensive report from database"""
-        all_leads = self.get_all_leads()
+        # Aggregate in SQL instead of loading every lead
+        scored = Lead.lead_score >= 0.0
         total_queries = self.session.query(SearchQuery).count()
-        # compute average safely
-        avg_score = (sum(l.lead_score for l in all_leads) / len(all_leads)) if all_leads else 0.0
+        total_leads, avg_score = self.session.execute(
+            select(func.count(Lead.id), func.avg(Lead.lead_score)).where(scored)
+        ).one()
+        avg_score = avg_score or 0.0
 
         report = f"""
     {'='*70}
@@ -439,24 +795,31 @@ class PayULeadGenerator:
 
     📊 Database Statistics:
     - Total search queries executed: {total_queries}
-    - Total leads in database: {len(all_leads)}
+    - Total leads in database: {total_leads}
     - Average lead score: {avg_score:.1f}
 
     🎯 Top 10 High-Score Leads:
     """
         
-        top_leads = sorted(all_leads, key=lambda x: x.lead_score, reverse=True)[:10]
+        top_leads = self.session.execute(
+            select(Lead.company_name, Lead.lead_score, Lead.industry, Lead.why_payu, Lead.source_url)
+            .where(scored)
+            .order_by(Lead.lead_score.desc())
+            .limit(10)
+        ).all()
         for i, lead in enumerate(top_leads, 1):
             report += f"\n{i}. {lead.company_name} (Score: {lead.lead_score})"
             report += f"\n   Industry: {lead.industry}"
             report += f"\n   Why PayU: {lead.why_payu[:80]}..."
             report += f"\n   Source: {lead.source_url}\n"
         
-        # Group by industry
+        # Group by the raw column so SQLite walks ix_lead_industry in order; NULL and '' merge into Unknown here
         industries = {}
-        for lead in all_leads:
-            ind = lead.industry or 'Unknown'
-            industries[ind] = industries.get(ind, 0) + 1
+        for industry, count in self.session.execute(
+            select(Lead.industry, func.count(Lead.id)).where(scored).group_by(Lead.industry)
+        ):
+            ind = industry or 'Unknown'
+            industries[ind] = industries.get(ind, 0) + count
         
         report += f"\n📈 Leads by Industry:\n"
         for industry, count in sorted(industries.items(), key=lambda x: x[1], reverse=True):
@@ -465,10 +828,19 @@ class PayULeadGenerator:
         return report
     
     def export_to_csv(self, filename: str = "payu_leads.csv"):
-        """Export leads to CSV file"""
+        """Export leads to CSV file, streaming rows so memory stays bounded"""
         import csv
         
-        leads = self.get_all_leads()
+        stmt = (
+            select(
+                Lead.company_name, Lead.industry, Lead.description, Lead.why_payu,
+                Lead.source_url, Lead.company_size, Lead.lead_score, Lead.status, Lead.created_at
+            )
+            .where(Lead.lead_score >= 0.0)
+            .order_by(Lead.lead_score.desc())
+            .execution_options(yield_per=1000)
+        )
+        exported = 0
         
         with open(filename, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
@@ -477,24 +849,93 @@ class PayULeadGenerator:
                 'Source URL', 'Company Size', 'Lead Score', 'Status', 'Created At'
             ])
             
-            for lead in leads:
-                writer.writerow([
-                    lead.company_name,
-                    lead.industry,
-                    lead.description,
-                    lead.why_payu,
-                    lead.source_url,
-                    lead.company_size,
-                    lead.lead_score,
-                    lead.status,
-                    lead.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-        
-        print(f"📄 Exported {len(leads)} leads to {filename}")
+            for row in self.session.execute(stmt):
+                *fields, created_at = row
+                writer.writerow([*fields, created_at.strftime('%Y-%m-%d %H:%M:%S')])
+                exported += 1
+        
+        print(f"📄 Exported {exported} leads to {filename}")
     
     def close(self):
-        """Close database session"""
+        """Close database session, pooled HTTP connections and the browser"""
         self.session.close()
+        self._http.close()
+        try:
+            self._run(self._close_browser())
+        finally:
+            self._loop.close()
+
+
+# Serper responses already read from the KV cache in this process, kept as (body, parsed).
+# Pool workers run many generation jobs, so repeat queries skip both SQLite and the parse;
+# the window in the memo key bounds how long a body can be served after its KV entry
+# expires. Bodies run to tens of KB, so only a few dozen are held. The parsed dicts are
+# shared between callers and must be treated as read-only
+_SERPER_MEMO_WINDOW_SECONDS = 300
+_SERPER_MEMO_MAX_ENTRIES = 64
+
+
+@functools.lru_cache(maxsize=_SERPER_MEMO_MAX_ENTRIES)
+def _memo_serper_entry(query: str, window: int) -> Tuple[bytes, Dict]:
+    body = get_cache().get(PayULeadGenerator.SERPER_CACHE, query)
+    if body is None:
+        # lru_cache does not store exceptions, so misses (and undecodable bodies) are looked up again next time
+        raise KeyError(query)
+    return body, orjson.loads(body)
+
+
+# How often a job waiting for a free generation slot re-checks the slot locks
+_SLOT_POLL_SECONDS = 1.0
+
+
+@contextlib.contextmanager
+def _generation_slot(db_path: str, slots: int):
+    """
+    Hold one of `slots` lock files next to the database until the block exits.
+    
+    Every API worker process owns its own generation pool, so the pool size alone
+    does not bound jobs across workers; these advisory locks cap the total per
+    database. Where `fcntl` is unavailable (Windows) jobs run uncapped.
+    """
+    if fcntl is None:
+        yield
+        return
+    handles = [open(f"{db_path}.generation-{i}.lock", "a+b") for i in range(slots)]
+    try:
+        while True:
+            for handle in handles:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                return
+            time.sleep(_SLOT_POLL_SECONDS)
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def run_lead_generation_job(db_path: str, max_queries: int, delay: int, max_concurrent: Optional[int] = None) -> int:
+    """
+    Build a generator, run it and return the number of leads saved.
+    
+    Module-level so it can be pickled into a worker process; the generator
+    (database session, Bedrock client) is created inside that process. With
+    `max_concurrent`, the job first waits for one of that many slots shared by
+    every process generating into the same database.
+    """
+    slot = _generation_slot(db_path, max_concurrent) if max_concurrent else contextlib.nullcontext()
+    with slot:
+        generator = PayULeadGenerator(db_path=db_path)
+        try:
+            result = generator.run_lead_generation(max_queries=max_queries, delay=delay)
+            return result.get('total_leads', 0)
+        finally:
+            generator.close()
 
 
 def main():
@@ -1,37 +1,52 @@
 import boto3
 import os
 import json
+import orjson
+import functools
+from typing import Optional
+
+from kv_cache import KVCache, get_cache
 
 class BedrockLLM:
-    def __init__(self):
+    # Responses are generated at temperature 0, so identical requests are served from the KV cache.
+    # This is the only LLM cache: callers (assessor, generator) rely on it rather than keeping their own
+    CACHE_NAMESPACE = "bedrock"
+    CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+    def __init__(self, use_cache: bool = True):
         self.bedrock = boto3.client(
             service_name='bedrock-runtime',
             region_name= os.environ['AWS_DEFAULT_REGION']
         )
         self.model_id = "openai.gpt-oss-safeguard-120b"
+        self.temperature = 0.0
+        self.cache: Optional[KVCache] = get_cache() if use_cache else None
 
     def _extract_bedrock_response_text(self, resp_obj) -> str:
+        if not resp_obj:
+            return ''
+        # documented Converse shape: output.message.content[0].text
         try:
-            if not resp_obj:
-                return ''
-            # common modern shape
-            out = resp_obj.get('output') if isinstance(resp_obj, dict) else None
-            if isinstance(out, dict):
-                msg = out.get('message')
-                if isinstance(msg, dict):
-                    content = msg.get('content')
-                    if isinstance(content, list) and content:
-                        for c in content:
-                            if isinstance(c, dict) and 'text' in c and isinstance(c['text'], str):
-                                return c['text']
-                            if isinstance(c, str):
-                                return c
-                            # nested content
-                            if isinstance(c, dict) and isinstance(c.get('content'), list):
-                                for sub in c.get('content'):
-                                    if isinstance(sub, dict) and isinstance(sub.get('text'), str):
-                                        return sub.get('text')
-            # fallback: search recursively for any 'text' key
+            text = resp_obj['output']['message']['content'][0]['text']
+            if isinstance(text, str):
+                return text
+        except (KeyError, IndexError, TypeError):
+            pass
+        try:
+            # shape mismatch (e.g. a reasoning block first): look through the content blocks
+            content = resp_obj.get('output', {}).get('message', {}).get('content')
+            if isinstance(content, list):
+                for c in content:
+                    if isinstance(c, dict) and isinstance(c.get('text'), str):
+                        return c['text']
+                    if isinstance(c, str):
+                        return c
+                    # nested content
+                    if isinstance(c, dict) and isinstance(c.get('content'), list):
+                        for sub in c.get('content'):
+                            if isinstance(sub, dict) and isinstance(sub.get('text'), str):
+                                return sub.get('text')
+            # last resort: search recursively for any 'text' key
             def search_for_text(obj):
                 if isinstance(obj, dict):
                     for k, v in obj.items():
@@ -58,14 +73,31 @@ class BedrockLLM:
         except Exception:
             return str(resp_obj)
 
+    def _cache_key(self, prompt: str, maxTokens: int) -> str:
+        return f"{self.model_id}|{maxTokens}|{self.temperature}|{prompt}"
+
+    def is_cached(self, prompt: str, maxTokens: int = 2000) -> bool:
+        """True when generate_text would answer this request from the cache, without calling Bedrock."""
+        return self.cache is not None and self.cache.get(self.CACHE_NAMESPACE, self._cache_key(prompt, maxTokens)) is not None
+
     def generate_text(self, prompt: str, maxTokens: int= 2000) -> str:
+        cache_key = self._cache_key(prompt, maxTokens)
+        if self.cache is not None:
+            cached = self.cache.get(self.CACHE_NAMESPACE, cache_key)
+            if cached is not None:
+                return cached.decode('utf-8')
+
         response= self.bedrock.converse(
                 modelId=self.model_id,
                 messages=[{"role": "user", "content": [{"text": prompt}]}],
-                inferenceConfig={"maxTokens": maxTokens, "temperature": 0.0},
+                inferenceConfig={"maxTokens": maxTokens, "temperature": self.temperature},
                 # responseFormat={"type": "json"}
             )
-        return self._extract_bedrock_response_text(response)
+        text = self._extract_bedrock_response_text(response)
+
+        if self.cache is not None and text:
+            self.cache.set(self.CACHE_NAMESPACE, cache_key, text.encode('utf-8'), expire=self.CACHE_TTL_SECONDS)
+        return text
 
     def generate_json(self, prompt: str, maxTokens: int= 2000) -> str:
         response = self.generate_text(prompt, maxTokens)
@@ -88,8 +120,8 @@ class BedrockLLM:
         leads = []
         # Try to parse JSON directly; if it fails, ask the LLM to reformat into valid JSON
         try:
-            leads = json.loads(clean_text)
-        except json.JSONDecodeError:
+            leads = orjson.loads(clean_text)
+        except orjson.JSONDecodeError:
             print(f"⚠️ Initial JSON parse failed asking LLM to reformat output into valid JSON...")
             fixer_prompt = (
                 "The assistant produced the following response which is intended to be a JSON array of lead objects, "
@@ -114,11 +146,17 @@ class BedrockLLM:
                         if fixed_text.startswith('json'):
                             fixed_text = fixed_text[4:]
                 fixed_text = fixed_text.strip()
-                leads = json.loads(fixed_text)
+                leads = orjson.loads(fixed_text)
                 clean_text = fixed_text
                 print(f"✅ LLM reformatted output into valid JSON")
             except Exception as e:
                 print(f"⚠️ JSON-fixer LLM failed for: {e}")
                 # re-raise to be handled by outer exception logic
                 raise
-        return leads
\ No newline at end of file
+        return leads
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm() -> BedrockLLM:
+    """Return the process-wide BedrockLLM; boto3 clients are thread-safe and costly to build."""
+    return BedrockLLM()
@@ -1,8 +1,12 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
-import json
-from typing import List, Any
+import httpx
+import orjson
+import string
+import functools
+import itertools
+from typing import List, Any, NamedTuple
+from urllib.parse import quote, urlparse, urlsplit
 
 st.set_page_config(page_title="AscendAI — Leads", layout="wide")
 
@@ -14,22 +18,251 @@ action = st.sidebar.radio("Action", ["Generate Leads", "Assess Leads", "List Lea
 
 col1, col2 = st.columns([3, 1])
 
+# One keep-alive pool per server process, shared by all sessions; HTTP/2 is used when the API serves it over TLS
+@st.cache_resource
+def _client() -> httpx.Client:
+    return httpx.Client(timeout=30, transport=httpx.HTTPTransport(http2=True, retries=2))
+
+# GET responses are reused across reruns; errors raise so they are never memoized
+@st.cache_data(ttl=60, max_entries=128, show_spinner=False)
+def _cached_get(api_base: str, path: str, params: tuple) -> Any:
+    r = _client().get(f"{api_base}{path}", params=dict(params))
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
 def post_json(path: str, payload: dict) -> Any:
+    # POSTs create or update leads, so they are never cached and invalidate cached reads
     try:
-        r = requests.post(f"{api_base}{path}", json=payload, timeout=60)
+        r = _client().post(
+            f"{api_base}{path}", content=orjson.dumps(payload), headers={"Content-Type": "application/json"}, timeout=60
+        )
         r.raise_for_status()
-        return r.json()
+        _cached_get.clear()
+        st.session_state.pop("lead_detail_cache", None)
+        return orjson.loads(r.content)
     except Exception as e:
         return {"error": str(e)}
 
 def get_json(path: str, params: dict = None) -> Any:
     try:
-        r = requests.get(f"{api_base}{path}", params=params, timeout=30)
-        r.raise_for_status()
-        return r.json()
+        return _cached_get(api_base, path, tuple(sorted((params or {}).items())))
     except Exception as e:
         return {"error": str(e)}
 
+# API values are untrusted text; escape them before they go into card and detail HTML
+_ESC = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'})
+
+def _esc(value: Any) -> str:
+    return str(value).translate(_ESC) if value is not None else ""
+
+def _esc_url(url: str) -> str:
+    # percent-encodes quotes, brackets and spaces so the value cannot leave its attribute
+    return quote(url or "", safe=":/?#[]@!$&()*+,;=%")
+
+_WEB_SCHEMES = frozenset({"http", "https"})
+
+def _is_web_url(url: str) -> bool:
+    # only http(s) values become href/src; javascript:, data: and the like are shown as text
+    try:
+        return urlsplit(url or "").scheme.lower() in _WEB_SCHEMES
+    except ValueError:
+        return False
+
+CARD_DEFAULT_IMG = 'https://img.freepik.com/premium-vector/illustration-vector-graphic-cartoon-character-company_516790-299.jpg'
+DETAIL_DEFAULT_IMG = 'https://img.freepik.com/free-vector/organic-flat-people-business-training-illustration_52683-59856.jpg'
+
+# Leads from one site share a favicon, so each source URL is parsed once per run
+@functools.lru_cache(maxsize=2048)
+def _favicon(url: str) -> str:
+    try:
+        parsed = urlparse(url)
+    except ValueError:  # e.g. an unterminated IPv6 host
+        return ""
+    return f"{parsed.scheme}://{parsed.netloc}/favicon.ico" if parsed.scheme.lower() in _WEB_SCHEMES and parsed.netloc else ""
+
+# Static markup is built once per server process and shared by every session and rerun
+@st.cache_resource
+def _card_css() -> str:
+    return """
+    <style>
+    .card-grid{display:grid;grid-template-columns:1fr;gap:16px}
+    .lead-card{display:flex;gap:16px;align-items:flex-start;background:#fbf7ff;border-left:6px solid #7c3aed;padding:14px;border-radius:10px;box-shadow:0 4px 12px rgba(124,58,237,0.08)}
+    .lead-image{width:120px;height:120px;border-radius:8px;object-fit:cover;flex:0 0 120px;background:#efe6ff}
+    .lead-content{flex:1;min-width:0}
+    .lead-title{font-weight:800;color:#4c1d95;font-size:20px;margin-bottom:6px}
+    .lead-meta{color:#5b21b6;font-size:13px;margin-bottom:8px}
+    .lead-desc{color:#312e81;font-size:14px;margin-bottom:8px}
+    .lead-footer{display:flex;justify-content:space-between;align-items:center;margin-top:8px}
+    .lead-score{background:#f3e8ff;color:#4c1d95;padding:6px 10px;border-radius:999px;font-weight:800}
+    .lead-link{color:#6d28d9;text-decoration:none;font-weight:700}
+    </style>
+    """
+
+@st.cache_resource
+def _card_template() -> string.Template:
+    return string.Template("""
+    <div class="lead-card">
+        $img_attr
+        <div class="lead-content">
+            <div class="lead-title">$name</div>
+            <div class="lead-meta">$industry $status</div>
+            <div class="lead-desc">$desc</div>
+            <div class="lead-footer">
+                <div class="lead-score">$score</div>
+                <div>$link</div>
+            </div>
+            $rationale
+        </div>
+    </div>
+    """)
+
+@st.cache_resource
+def _detail_template() -> string.Template:
+    return string.Template("""
+    <div style="font-family:Inter,Segoe UI,Arial;margin:12px;padding:18px;background:#ffffff;border-radius:10px;box-shadow:0 6px 24px rgba(16,24,40,0.06);">
+      <div style="display:flex;flex-direction:column;gap:16px">
+        <div style="text-align:center">$img_tag</div>
+        <div style="flex:1;min-width:0">
+          <div style="color:#4c1d95;font-size:26px;font-weight:800">$name</div>
+          <div style="color:#6b21a8;margin-top:6px;font-size:14px">$industry $status</div>
+          <div style="color:#0f172a;margin-top:12px;font-size:15px">$desc</div>
+          $link
+          <div style="margin-top:12px;display:flex;justify-content:space-between;align-items:center">
+            <div style="font-weight:800;background:#fbf7ff;color:#4c1d95;padding:8px 12px;border-radius:999px">Lead score: $score</div>
+          </div>
+          $factors
+          $rationales
+        </div>
+      </div>
+    </div>
+    """)
+
+CARD_CHUNK_SIZE = 20
+
+class LeadView(NamedTuple):
+    """One lead's card fields, escaped and ready for _card_template()."""
+    img_attr: str
+    name: str
+    industry: str
+    status: str
+    desc: str
+    score: str
+    link: str
+    rationale: str
+
+def _to_view(lead: dict) -> LeadView:
+    url = lead.get('source_url') or ''
+    status = lead.get('status') or ''
+    score = lead.get('lead_score')
+    # try to extract short rationale
+    rationale = ''
+    assessment = lead.get('assessment')
+    if isinstance(assessment, dict):
+        ras = assessment.get('rationales') or assessment.get('rationale') or ''
+        if isinstance(ras, dict):
+            rationale = ' ; '.join(f"{k}: {v}" for k, v in itertools.islice(ras.items(), 2))
+        else:
+            rationale = str(ras)[:220]
+
+    # image fallback: use provided image or favicon of source_url
+    img = lead.get('image')
+    if not _is_web_url(img):
+        img = _favicon(url) or CARD_DEFAULT_IMG
+
+    return LeadView(
+        img_attr=f'<img class="lead-image" src="{_esc_url(img)}" alt="logo" onerror="this.style.display=\'none\'"/>' if img else '<div class="lead-image"></div>',
+        name=_esc(lead.get('company_name') or '—'),
+        industry=_esc(lead.get('industry') or ''),
+        status=('• ' + _esc(status)) if status else '',
+        desc=_esc((lead.get('description') or '')[:260]),
+        score=_esc(score if score is not None else ''),
+        link=f'<a class="lead-link" href="{_esc_url(url)}" target="_blank">Website</a>' if _is_web_url(url) else _esc(url),
+        rationale=f'<div style="margin-top:8px;color:#4c1d95;font-size:13px">Reason: {_esc(rationale)}</div>' if rationale else '',
+    )
+
+def _render_cards(leads: List[dict]) -> str:
+    """Card grid markup for one chunk of leads, stylesheet included."""
+    template = _card_template()
+    # collect fragments and join once; += would re-copy the page for every card
+    parts: List[str] = [_card_css(), '<div class="card-grid">']
+    parts.extend(template.substitute(_to_view(lead)._asdict()) for lead in leads)
+    parts.append('</div>')
+    return "".join(parts)
+
+def _render_detail(lead: dict) -> str:
+    """Lead Detail markup for one /leads/{id} response."""
+    # Prepare fields
+    name = lead.get("company_name") or "—"
+    industry = lead.get("industry") or ""
+    url = lead.get("source_url") or ""
+    score = lead.get("lead_score") if lead.get("lead_score") is not None else ""
+    status = lead.get("status") or ""
+    desc = (lead.get("description") or "")
+    assessment = lead.get("assessment")
+    if not isinstance(assessment, dict):
+        assessment = {}
+
+    # Build factor list HTML (as vertical list, not chips)
+    factors_html = ""
+    # show known factor keys and scores; floats formatted to 2 places
+    items = "".join(
+        f'<li style="padding:8px 0;border-bottom:1px solid #e9d5ff"><strong style="color:#4c1d95">{_esc(k)}:</strong> '
+        f'<span style="color:#6b21a8">{_esc(f"{v:.2f}" if isinstance(v, float) else v)}</span></li>'
+        for k, v in assessment.items()
+        if k not in ("rationales", "raw_search_snippets", "rationale")
+    )
+    if items:
+        factors_html = f'<ul style="margin-top:8px;list-style-type:none;padding:0">{items}</ul>'
+
+    # rationales
+    rationale_html = ""
+    ras = assessment.get("rationales") or assessment.get("rationale")
+    if ras:
+        if isinstance(ras, dict):
+            items = "".join(f"<li><strong>{_esc(k)}:</strong> {_esc(v)}</li>" for k, v in ras.items())
+            rationale_html = f"<ul style='margin-top:8px'>{items}</ul>"
+        else:
+            rationale_html = f"<p style='margin-top:8px'>{_esc(ras)}</p>"
+
+    # image handling
+    img = lead.get('image')
+    if not _is_web_url(img):
+        img = _favicon(url) or DETAIL_DEFAULT_IMG
+
+    img_tag = f'<img src="{_esc_url(img)}" alt="logo" style="width:100%;max-width:280px;height:auto;border-radius:8px" onerror="this.style.display=\'none\'"/>' if img else '<div style="width:280px;height:180px;border-radius:8px;background:#efe6ff"></div>'
+
+    return _detail_template().substitute(
+        img_tag=img_tag,
+        name=_esc(name),
+        industry=_esc(industry),
+        status=('• ' + _esc(status)) if status else '',
+        desc=_esc(desc),
+        link=(
+            f'<div style="margin-top:12px"><a href="{_esc_url(url)}" target="_blank" style="color:#6d28d9;font-weight:700">Visit Website</a></div>'
+            if _is_web_url(url) else f'<div style="margin-top:12px">{_esc(url)}</div>' if url else ''
+        ),
+        score=_esc(score),
+        factors=f'<div style="margin-top:12px"><strong>Factors:</strong>{factors_html}</div>' if factors_html else '',
+        rationales=f'<div style="margin-top:12px"><strong>Rationales:</strong>{rationale_html}</div>' if rationale_html else '',
+    )
+
+# Rendered HTML kept per session, so reruns and switching actions back and forth reuse
+# it for as long as the underlying API data is unchanged
+SESSION_HTML_MAX_ENTRIES = 64
+
+def _session_html(slot: str, key: Any, data: Any, render) -> str:
+    cache = st.session_state.setdefault(slot, {})
+    hit = cache.get(key)
+    if hit is None or hit[0] != data:
+        if len(cache) >= SESSION_HTML_MAX_ENTRIES:
+            cache.clear()
+        hit = cache[key] = (data, render(data))
+    return hit[1]
+
+if st.sidebar.button("Refresh data"):
+    _cached_get.clear()
+    st.session_state.pop("lead_detail_cache", None)
+
 with col1:
     st.title("AscendAI — Lead Tools")
     st.write("Minimalist UI to call the lead generation and assessment API.")
@@ -69,84 +302,31 @@ with col1:
         limit = st.number_input("Limit", min_value=1, max_value=200, value=20)
         offset = st.number_input("Offset", min_value=0, value=0)
         if st.button("List"):
-            params = {"limit": limit, "offset": offset}
+            # detail rows match /leads/{id}, so Lead Detail can reuse them without another request
+            params = {"limit": limit, "offset": offset, "detail": "true"}
             if status:
                 params["status"] = status
+            # kept in the session so "Load more" reruns redraw from the cached response
+            st.session_state.list_params = params
+            st.session_state.cards_shown = CARD_CHUNK_SIZE
+        params = st.session_state.get("list_params")
+        if params is not None:
             resp = get_json("/leads", params=params)
             st.subheader("Results")
             if isinstance(resp, dict) and resp.get("leads"):
                 leads = resp.get("leads")
-                if not leads:
-                    st.info("No leads found")
-                else:
-                    # Render cards with a green accent
-                                        card_css = """
-                                        <style>
-                                        .card-grid{display:grid;grid-template-columns:1fr;gap:16px}
-                                        .lead-card{display:flex;gap:16px;align-items:flex-start;background:#fbf7ff;border-left:6px solid #7c3aed;padding:14px;border-radius:10px;box-shadow:0 4px 12px rgba(124,58,237,0.08)}
-                                        .lead-image{width:120px;height:120px;border-radius:8px;object-fit:cover;flex:0 0 120px;background:#efe6ff}
-                                        .lead-content{flex:1;min-width:0}
-                                        .lead-title{font-weight:800;color:#4c1d95;font-size:20px;margin-bottom:6px}
-                                        .lead-meta{color:#5b21b6;font-size:13px;margin-bottom:8px}
-                                        .lead-desc{color:#312e81;font-size:14px;margin-bottom:8px}
-                                        .lead-footer{display:flex;justify-content:space-between;align-items:center;margin-top:8px}
-                                        .lead-score{background:#f3e8ff;color:#4c1d95;padding:6px 10px;border-radius:999px;font-weight:800}
-                                        .lead-link{color:#6d28d9;text-decoration:none;font-weight:700}
-                                        </style>
-                                        """
-
-                                        html = card_css + '<div class="card-grid">'
-                                        for lead in leads:
-                                                name = lead.get('company_name') or '—'
-                                                industry = lead.get('industry') or ''
-                                                score = lead.get('lead_score') if lead.get('lead_score') is not None else ''
-                                                url = lead.get('source_url') or ''
-                                                status = lead.get('status') or ''
-                                                desc = (lead.get('description') or '')[:260]
-                                                # try to extract short rationale
-                                                assessment = lead.get('assessment') or {}
-                                                rationale = ''
-                                                if isinstance(assessment, dict):
-                                                        ras = assessment.get('rationales') or assessment.get('rationale') or ''
-                                                        if isinstance(ras, dict):
-                                                                parts = [f"{k}: {v}" for k, v in list(ras.items())[:2]]
-                                                                rationale = ' ; '.join(parts)
-                                                        else:
-                                                                rationale = str(ras)[:220]
-
-                                                # image fallback: use provided image or favicon of source_url
-                                                img = lead.get('image') or 'https://img.freepik.com/premium-vector/illustration-vector-graphic-cartoon-character-company_516790-299.jpg'
-                                                if not img and url:
-                                                        try:
-                                                                from urllib.parse import urlparse
-                                                                parsed = urlparse(url)
-                                                                img = f"{parsed.scheme}://{parsed.netloc}/favicon.ico"
-                                                        except Exception:
-                                                                img = ''
-
-                                                img_attr = f'<img class="lead-image" src="{img}" alt="logo" onerror="this.style.display=\'none\'"/>' if img else '<div class="lead-image"></div>'
-
-                                                html += f"""
-                                                <div class="lead-card">
-                                                    {img_attr}
-                                                    <div class="lead-content">
-                                                        <div class="lead-title">{name}</div>
-                                                        <div class="lead-meta">{industry} {('• ' + status) if status else ''}</div>
-                                                        <div class="lead-desc">{desc}</div>
-                                                        <div class="lead-footer">
-                                                            <div class="lead-score">{score}</div>
-                                                            <div><a class="lead-link" href="{url}" target="_blank">Website</a></div>
-                                                        </div>
-                                                        {f'<div style="margin-top:8px;color:#4c1d95;font-size:13px">Reason: {rationale}</div>' if rationale else ''}
-                                                    </div>
-                                                </div>
-                                                """
-                                        html += '</div>'
-                                        # height: one card per row, calculate rows
-                                        rows = len(leads)
-                                        height = min(1600, 160 * rows + 80)
-                                        components.html(html, height=height, scrolling=True)
-                                        st.caption(f"Showing {len(leads)} leads")
+                st.session_state.lead_detail_cache = {lead["id"]: lead for lead in leads}
+                shown = leads[:st.session_state.cards_shown]
+                # Cards render in chunks, one iframe each, so the first cards show without waiting
+                # on the whole list; iframes do not share styles, so each chunk carries the CSS
+                for start in range(0, len(shown), CARD_CHUNK_SIZE):
+                    chunk = shown[start:start + CARD_CHUNK_SIZE]
+                    html = _session_html("card_html", (api_base, tuple(sorted(params.items())), start), chunk, _render_cards)
+                    components.html(html, height=160 * len(chunk) + 40, scrolling=True)
+                st.caption(f"Showing {len(shown)} of {len(leads)} leads")
+                if len(shown) < len(leads) and st.button("Load more"):
+                    st.session_state.cards_shown += CARD_CHUNK_SIZE
+                    st.rerun()
             else:
                 st.json(resp)
 
@@ -154,74 +334,12 @@ with col1:
         st.header("Lead Detail")
         lead_id = st.number_input("Lead ID", min_value=1, value=1)
         if st.button("Get Lead"):
-            resp = get_json(f"/leads/{lead_id}")
+            st.session_state.detail_id = lead_id
+        detail_id = st.session_state.get("detail_id")
+        if detail_id is not None:
+            resp = st.session_state.get("lead_detail_cache", {}).get(detail_id) or get_json(f"/leads/{detail_id}")
             if isinstance(resp, dict) and resp.get("id"):
-                lead = resp
-                # Prepare fields
-                name = lead.get("company_name") or "—"
-                industry = lead.get("industry") or ""
-                url = lead.get("source_url") or ""
-                score = lead.get("lead_score") if lead.get("lead_score") is not None else ""
-                status = lead.get("status") or ""
-                desc = (lead.get("description") or "")
-                assessment = lead.get("assessment") or {}
-
-                # Build factor list HTML (as vertical list, not chips)
-                factors_html = ""
-                if isinstance(assessment, dict):
-                    # show known factor keys and scores
-                    keys = [k for k in assessment.keys() if k not in ("rationales", "raw_search_snippets", "rationale")]
-                    if keys:
-                        factors_html += "<ul style=\"margin-top:8px;list-style-type:none;padding:0\">"
-                        for k in keys:
-                            v = assessment.get(k)
-                            # format floats nicely
-                            disp = f"{v:.2f}" if isinstance(v, float) else str(v)
-                            factors_html += f'<li style="padding:8px 0;border-bottom:1px solid #e9d5ff"><strong style="color:#4c1d95">{k}:</strong> <span style="color:#6b21a8">{disp}</span></li>'
-                        factors_html += '</ul>'
-
-                # rationales
-                rationale_html = ""
-                ras = assessment.get("rationales") or assessment.get("rationale")
-                if ras:
-                    if isinstance(ras, dict):
-                        parts = [f"<li><strong>{k}:</strong> {v}</li>" for k, v in ras.items()]
-                        rationale_html = f"<ul style='margin-top:8px'>{''.join(parts)}</ul>"
-                    else:
-                        rationale_html = f"<p style='margin-top:8px'>{str(ras)}</p>"
-
-                # image handling
-                img = lead.get('image') or 'https://img.freepik.com/free-vector/organic-flat-people-business-training-illustration_52683-59856.jpg'
-                if not img and url:
-                    try:
-                        from urllib.parse import urlparse
-                        parsed = urlparse(url)
-                        img = f"{parsed.scheme}://{parsed.netloc}/favicon.ico"
-                    except Exception:
-                        img = ''
-
-                img_tag = f'<img src="{img}" alt="logo" style="width:100%;max-width:280px;height:auto;border-radius:8px" onerror="this.style.display=\'none\'"/>' if img else '<div style="width:280px;height:180px;border-radius:8px;background:#efe6ff"></div>'
-
-                detail_html = f"""
-                <div style="font-family:Inter,Segoe UI,Arial;margin:12px;padding:18px;background:#ffffff;border-radius:10px;box-shadow:0 6px 24px rgba(16,24,40,0.06);">
-                  <div style="display:flex;flex-direction:column;gap:16px">
-                    <div style="text-align:center">{img_tag}</div>
-                    <div style="flex:1;min-width:0">
-                      <div style="color:#4c1d95;font-size:26px;font-weight:800">{name}</div>
-                      <div style="color:#6b21a8;margin-top:6px;font-size:14px">{industry} {('• ' + status) if status else ''}</div>
-                      <div style="color:#0f172a;margin-top:12px;font-size:15px">{desc}</div>
-                      {f'<div style="margin-top:12px"><a href="{url}" target="_blank" style="color:#6d28d9;font-weight:700">Visit Website</a></div>' if url else ''}
-                      <div style="margin-top:12px;display:flex;justify-content:space-between;align-items:center">
-                        <div style="font-weight:800;background:#fbf7ff;color:#4c1d95;padding:8px 12px;border-radius:999px">Lead score: {score}</div>
-                      </div>
-                      {f'<div style="margin-top:12px"><strong>Factors:</strong>{factors_html}</div>' if factors_html else ''}
-                      {f'<div style="margin-top:12px"><strong>Rationales:</strong>{rationale_html}</div>' if rationale_html else ''}
-                    </div>
-                  </div>
-                </div>
-                """
-
-                components.html(detail_html, height=620)
+                components.html(_session_html("detail_html", detail_id, resp, _render_detail), height=620)
             else:
                 st.error("Lead not found or API error")
 
@@ -2,36 +2,41 @@
 Ignore this file for now. It is just for testing purposes.
 """
 
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
-import html2text
+import re
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from selectolax.lexbor import LexborHTMLParser as HTMLParser
 
-def soup_to_raw_data(soup):
+_WS_RE = re.compile(r'\s+')
+_HEADING_PREFIX = {'h1': '# ', 'h2': '## ', 'h3': '### ', 'h4': '#### ', 'h5': '##### ', 'h6': '###### '}
+_BLOCK_TAGS = {'p', 'div', 'section', 'article', 'header', 'footer', 'nav', 'aside', 'main',
+               'ul', 'ol', 'table', 'blockquote', 'pre', 'figure'}
+
+def soup_to_raw_data(tree):
          # Build a cleaned text snippet to send to the LLM (truncate to avoid huge payloads)
-        paragraphs = [p.get_text(separator=' ', strip=True) for p in soup.find_all('p')]
-        headings = [h.get_text(separator=' ', strip=True) for h in soup.find_all(['h1', 'h2', 'h3'])]
+        paragraphs = [p.text(separator=' ', strip=True) for p in tree.css('p')]
+        headings = [h.text(separator=' ', strip=True) for h in tree.css('h1, h2, h3')]
         # Extract list items
-        list_items = [li.get_text(separator=' ', strip=True) for li in soup.find_all('li')]
+        list_items = [li.text(separator=' ', strip=True) for li in tree.css('li')]
         # Extract tables into a simple text/markdown representation
         tables = []
-        for table in soup.find_all('table'):
+        for table in tree.css('table'):
             rows = []
             # headers
-            ths = [th.get_text(separator=' ', strip=True) for th in table.find_all('th')]
+            ths = [th.text(separator=' ', strip=True) for th in table.css('th')]
             if ths:
                 rows.append(' | '.join(ths))
                 rows.append(' | '.join(['---'] * len(ths)))
             # body rows
-            for tr in table.find_all('tr'):
-                cols = [c.get_text(separator=' ', strip=True) for c in tr.find_all(['td', 'th'])]
+            for tr in table.css('tr'):
+                cols = [c.text(separator=' ', strip=True) for c in tr.css('td, th')]
                 if cols:
                     rows.append(' | '.join(cols))
             if rows:
                 tables.append('\n'.join(rows))
         meta_desc = ''
-        md = soup.find('meta', attrs={'name': 'description'})
-        if md and md.get('content'):
-            meta_desc = md.get('content').strip()
+        md = tree.css_first('meta[name="description"]')
+        if md and md.attributes.get('content'):
+            meta_desc = md.attributes.get('content').strip()
 
         # Compose page text including headings, paragraphs, lists and tables so the LLM sees tabular data
         page_sections = []
@@ -50,27 +55,103 @@ def soup_to_raw_data(soup):
         page_text = '\n\n'.join(page_sections)
         return page_text
 
-def url_to_markdown_js(url):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True, args=["--no-sandbox"])
-        page = browser.new_page()
+def _walk_markdown(node, parts):
+    # Headings, paragraphs, list items, table rows, links and line breaks only; everything else is plain text
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == '-text':
+            parts.append(_WS_RE.sub(' ', child.text_content or ''))
+        elif tag == 'br':
+            parts.append('\n')
+        elif tag == 'a' and child.attributes.get('href'):
+            text = _WS_RE.sub(' ', child.text()).strip()
+            parts.append(f"[{text}]({child.attributes['href']})" if text else '')
+        elif tag in _HEADING_PREFIX:
+            parts.append('\n\n' + _HEADING_PREFIX[tag])
+            _walk_markdown(child, parts)
+            parts.append('\n\n')
+        elif tag == 'li':
+            parts.append('\n* ')
+            _walk_markdown(child, parts)
+        elif tag == 'tr':
+            _walk_markdown(child, parts)
+            parts.append('|\n')
+        elif tag in ('td', 'th'):
+            parts.append('| ')
+            _walk_markdown(child, parts)
+            parts.append(' ')
+        elif tag in _BLOCK_TAGS:
+            parts.append('\n\n')
+            _walk_markdown(child, parts)
+            parts.append('\n\n')
+        else:
+            _walk_markdown(child, parts)
+
+def html_to_markdown(tree):
+    parts = []
+    _walk_markdown(tree.body or tree.root, parts)
+    markdown = re.sub(r' *\n *', '\n', ''.join(parts))
+    return re.sub(r'\n{3,}', '\n\n', markdown).strip()
+
+class JsMarkdownScraper:
+    """Renders pages in one headless Chromium, kept open across URLs; each URL gets a fresh context."""
+
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
 
-        page.goto(url, wait_until="networkidle")
+    def _get_browser(self):
+        if self._browser is None:
+            self._playwright = sync_playwright().start()
+            # containers often cap /dev/shm at 64 MB, which crashes Chromium tabs on large pages
+            self._browser = self._playwright.chromium.launch(headless=True, args=["--no-sandbox", "--disable-dev-shm-usage"])
+        return self._browser
 
-        html = page.content()
-        browser.close()
+    def get_html(self, url):
+        context = self._get_browser().new_context()
+        try:
+            page = context.new_page()
+            # networkidle waits on ads and trackers; the DOM plus the main content block is enough
+            page.goto(url, wait_until="domcontentloaded", timeout=15000)
+            try:
+                page.wait_for_selector("article, main, [role='main']", timeout=3000)
+            except PlaywrightTimeoutError:
+                pass
+            return page.content()
+        finally:
+            context.close()
 
-    soup = BeautifulSoup(html, "html.parser")
+    def to_markdown(self, url):
+        tree = HTMLParser(self.get_html(url))
 
-    # print(soup_to_raw_data(soup))
-    # return
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
+        # print(soup_to_raw_data(tree))
+        # return
+        tree.strip_tags(["script", "style", "noscript"])
 
-    cleaned_html = soup.prettify()
+        return html_to_markdown(tree)
+
+    def close(self):
+        if self._browser is not None:
+            self._browser.close()
+            self._playwright.stop()
+            self._browser = None
+            self._playwright = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def url_to_markdown_js(url):
+    # Single URL; use urls_to_markdown_js or JsMarkdownScraper to reuse the browser across many URLs
+    with JsMarkdownScraper() as scraper:
+        return scraper.to_markdown(url)
 
-    markdown = html2text.html2text(cleaned_html)
-    return markdown
+def urls_to_markdown_js(urls):
+    # One Chromium launch for the whole batch; each URL still gets its own context
+    with JsMarkdownScraper() as scraper:
+        return [scraper.to_markdown(url) for url in urls]
 
 # Example
 # print(url_to_markdown("https://techcrunch.com/2025/11/26/here-are-the-49-us-ai-startups-that-have-raised-100m-or-more-in-2025/"))
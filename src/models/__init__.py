@@ -1,3 +1,3 @@
 from .lead import Lead
 from .search_query import SearchQuery
-from .base import Base
\ No newline at end of file
+from .base import Base, JSONDocument, json_serializer
\ No newline at end of file
@@ -1,3 +1,33 @@
+import orjson
+from sqlalchemy import Text
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.types import TypeDecorator
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+def json_serializer(value) -> str:
+    """orjson-backed serializer for JSON documents stored as text."""
+    return orjson.dumps(value).decode()
+
+
+class JSONDocument(TypeDecorator):
+    """JSON document stored in a TEXT column, encoded and decoded in Python with orjson.
+
+    The column type stays TEXT on every backend, so existing databases need no
+    migration. Python None stays SQL NULL. A legacy value that is not valid JSON
+    is returned as the stored string rather than failing the load.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else json_serializer(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value
@@ -1,12 +1,25 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
-from .base import Base
+from .base import Base, JSONDocument
 
 class Lead(Base):
     """SQLAlchemy model for storing leads"""
     __tablename__ = 'leads'
+    __table_args__ = (
+        # Serves WHERE status = ? (leftmost prefix) and covers the /stats GROUP BY status, AVG(lead_score)
+        Index('ix_lead_status_score', 'status', 'lead_score'),
+        # Lets the assessor read pending lead ids in created_at order from the index alone, and
+        # serves /leads?status= newest-first pages (the rowid tie-breaker is implicit in the index)
+        Index('ix_lead_status_created', 'status', 'created_at'),
+        # Newest-first pages of the unfiltered /leads listing
+        Index('ix_lead_created', 'created_at'),
+        # Top-N by score for the report, CSV export and unfiltered listings
+        Index('ix_lead_score', 'lead_score'),
+        # Report's per-industry counts; lead_score included so the score filter is answered from the index
+        Index('ix_lead_industry', 'industry', 'lead_score'),
+    )
     
     id = Column(Integer, primary_key=True)
     company_name = Column(String(255), nullable=False)
@@ -20,7 +33,7 @@ class Lead(Base):
     status = Column(String(50), default='new')
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    raw_data = Column(Text)  # Store original JSON
+    raw_data = Column(JSONDocument)  # Original extracted lead, plus the assessment once assessed
     
     def __repr__(self):
         return f"<Lead(company_name='{self.company_name}', industry='{self.industry}')>"
@@ -2,7 +2,7 @@ from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, F
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
-from .base import Base
+from .base import Base, JSONDocument
 
 class SearchQuery(Base):
     """Track search queries executed"""
@@ -12,7 +12,7 @@ class SearchQuery(Base):
     query = Column(String(255), nullable=False)
     leads_found = Column(Integer, default=0)
     executed_at = Column(DateTime, default=datetime.utcnow)
-    raw_response = Column(Text)
+    raw_response = Column(JSONDocument)
     
     def __repr__(self):
         return f"<SearchQuery(query='{self.query}', leads={self.leads_found})>"
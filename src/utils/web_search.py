@@ -1,10 +1,11 @@
 from urllib.parse import urlparse
 import hashlib
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
+import tempfile
 import requests
-import json
+import orjson
 
 def search_with_serper(self, query: str) -> Dict:
     """
@@ -16,23 +17,40 @@ def search_with_serper(self, query: str) -> Dict:
     Returns:
         Dict containing search results from Serper API
     """
+    return _search_with_serper(self, query)[1]
+
+def search_with_serper_raw(self, query: str) -> bytes:
+    """
+    Perform a web search using Serper API, returning the JSON body unparsed
+    
+    For callers that forward or embed the response as-is, so it is never
+    re-encoded. Returns b"{}" when the search fails.
+    """
+    return _search_with_serper(self, query)[0]
+
+def _search_with_serper(self, query: str) -> Tuple[bytes, Dict]:
+    """
+    Shared body of the Serper search variants: the response bytes plus the dict
+    parsed while validating them, so neither variant decodes the body twice.
+    Returns (b"{}", {}) when the search fails.
+    """
     url = "https://google.serper.dev/search"
 
     # simple file cache for serper responses
     cache_dir = Path("cache/serper")
     cache_dir.mkdir(parents=True, exist_ok=True)
-    qhash = hashlib.sha256(query.encode('utf-8')).hexdigest()
+    qhash = hashlib.blake2b(query.encode('utf-8'), digest_size=16).hexdigest()
     cache_file = cache_dir / f"{qhash}.json"
 
-    # return cached response if present
+    # return cached response if present; unreadable or undecodable files count as a miss
     if cache_file.exists():
         try:
-            with cache_file.open('r', encoding='utf-8') as fh:
-                return json.load(fh)
-        except Exception as e:
+            cached = cache_file.read_bytes()
+            return cached, orjson.loads(cached)
+        except (OSError, orjson.JSONDecodeError) as e:
             print(f"⚠️ Failed to read cache for query: {e}")
 
-    payload = json.dumps({
+    payload = orjson.dumps({
         "q": query
     })
 
@@ -44,14 +62,32 @@ def search_with_serper(self, query: str) -> Dict:
     try:
         response = requests.post(url, headers=headers, data=payload, timeout=30)
         response.raise_for_status()
-        data = response.json()
-        # save to cache (best-effort)
-        try:
-            with cache_file.open('w', encoding='utf-8') as fh:
-                json.dump(data, fh)
-        except Exception as e:
-            print(f"⚠️ Failed to write cache file: {e}")
-        return data
     except requests.exceptions.RequestException as e:
         print(f"⚠️ Serper API error: {e}")
-        return {}
\ No newline at end of file
+        return b"{}", {}
+
+    if 'json' not in response.headers.get('Content-Type', ''):
+        print(f"⚠️ Serper API error: unexpected content type {response.headers.get('Content-Type')!r}")
+        return b"{}", {}
+    # only a body that parses is cached, so a truncated or HTML error page is never replayed
+    try:
+        parsed = orjson.loads(response.content)
+    except orjson.JSONDecodeError as e:
+        print(f"⚠️ Serper API error: {e}")
+        return b"{}", {}
+    # save to cache (best-effort), stored as received; written to a temp file in the same
+    # directory and renamed into place so a concurrent reader never sees a partial file
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as tmp:
+            tmp_path = tmp.name
+            tmp.write(response.content)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        print(f"⚠️ Failed to write cache file: {e}")
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+    return response.content, parsed